@@ -0,0 +1,190 @@
+"""One background worker that runs every search the app needs.
+
+Requests are queued by priority (an AI move before a hint before the eval
+bar).  A new request preempts a lower-priority search, which goes back on
+the queue, and replaces any request of the same kind, which is cancelled
+because the position it was for is gone.  Results are published on the
+request as each depth completes, so the UI thread only ever reads them.
+
+With `ponder`, each AI move is followed by Engine.ponder on the expected
+reply.  An eval request for the position after the move is then answered
+from that search instead of a new one, and the next AI move picks it up;
+any other search ends it.
+"""
+import heapq
+import itertools
+import threading
+
+from time_control import TimeControl
+
+MOVE, HINT, EVAL = 0, 1, 2  # kinds, in priority order
+
+
+class AnalysisRequest:
+    """A search of one position, and the latest result published for it."""
+
+    def __init__(self, kind, board, time_control, callback=None):
+        self.kind = kind
+        self.board = board.copy()
+        self.player = board.current_player
+        self.time_control = time_control
+        self.callback = callback  # called on the worker thread with each update
+        self.score = None  # from the side to move
+        self.depth = 0
+        self.move = None
+        self.pv = []
+        self.done = False
+        self.cancelled = False
+        self._preempted = False
+        self._stop = threading.Event()
+
+    def matches(self, board):
+        return (self.board.black, self.board.white, self.player) == \
+            (board.black, board.white, board.current_player)
+
+    def score_for(self, color):
+        """The score from `color`'s point of view (None until the first result)."""
+        if self.score is None:
+            return None
+        return self.score if color == self.player else -self.score
+
+    def cancel(self):
+        self.cancelled = True
+        self._stop.set()
+
+    def _publish(self, depth, score, pv):
+        self.depth, self.score, self.pv = depth, score, pv
+        self.move = pv[0] if pv else None
+        if self.callback is not None:
+            self.callback(self)
+
+
+class AnalysisService:
+    """Runs requests one at a time on a single engine and worker thread."""
+
+    def __init__(self, engine, ponder=False):
+        self.engine = engine
+        self.ponder = ponder
+        self._pondered = None  # (position, reply) the engine is pondering after
+        self._queue = []  # heap of (kind, seq, request)
+        self._seq = itertools.count()
+        self._current = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, board, time_control=None, callback=None):
+        """Queue a search of `board`; returns the request to poll for results.
+
+        Without a time control the search runs until it is cancelled or has
+        nothing left to deepen.
+        """
+        request = AnalysisRequest(kind, board, time_control or TimeControl(), callback)
+        with self._cond:
+            self._cancel_kind(kind)
+            current = self._current
+            if current is not None and current.kind > kind:
+                current._preempted = True
+                current._stop.set()
+            heapq.heappush(self._queue, (kind, next(self._seq), request))
+            self._cond.notify()
+        return request
+
+    def cancel(self, kind=None):
+        """Cancel queued and running requests of one kind, or all of them."""
+        with self._cond:
+            for k in (MOVE, HINT, EVAL) if kind is None else (kind,):
+                self._cancel_kind(k)
+
+    def _cancel_kind(self, kind):
+        if self._current is not None and self._current.kind == kind:
+            self._current.cancel()
+        for _, _, request in self._queue:
+            if request.kind == kind:
+                request.cancel()
+        self._queue = [item for item in self._queue if item[0] != kind]
+        heapq.heapify(self._queue)
+
+    def close(self):
+        """Cancel everything and stop the worker."""
+        with self._cond:
+            self._closed = True
+            self._cancel_kind(MOVE)
+            self._cancel_kind(HINT)
+            self._cancel_kind(EVAL)
+            self._cond.notify()
+        self._thread.join()
+        self.engine.close()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _, _, request = heapq.heappop(self._queue)
+                self._current = request
+            self._run(request)
+            with self._cond:
+                self._current = None
+                if request._preempted and not (request.cancelled or request.done):
+                    # start over once the more urgent search is done; the
+                    # transposition table keeps what it had found
+                    request._preempted = False
+                    request._stop.clear()
+                    heapq.heappush(self._queue, (request.kind, next(self._seq), request))
+
+    def _run(self, request):
+        engine = self.engine
+        if request.kind == EVAL and self._pondered is not None \
+                and request.matches(self._pondered[0]):
+            self._follow_ponder(request)
+            return
+        self._pondered = None
+        if engine.pondering is not None and not request.matches(engine.pondering):
+            # a miss: stop it before changing the engine under it; a hit is
+            # taken over by get_best_move
+            engine.stop_ponder()
+        # the engine searches for the side to move, whoever that is
+        engine.color = request.player
+        engine.time_control = request.time_control
+        engine.on_iteration = request._publish
+        try:
+            move = engine.get_best_move(request.board, request._stop)
+        finally:
+            engine.on_iteration = None
+        if request._preempted or request.cancelled:
+            return
+        if move is not None and move != request.move:
+            # stopped before depth 2 finished: the depth-1 choice
+            request.move, request.pv = move, [move]
+        request.done = True
+        if request.callback is not None:
+            request.callback(request)
+        if self.ponder and request.kind == MOVE and move is not None:
+            position = request.board.copy()
+            position.make_move(*move)
+            reply = engine.ponder(position)
+            if reply is not None:
+                self._pondered = (position, reply)
+
+    def _follow_ponder(self, request):
+        """Publish the ponder search's results on `request` until it is
+        stopped.  They are for the position after the expected reply, so
+        one ply deeper and from the other side."""
+        engine = self.engine
+        reply = self._pondered[1]
+
+        def publish(depth, score, pv):
+            request._publish(depth + 1, -score, [reply] + pv)
+
+        engine.on_iteration = publish
+        try:
+            if engine.last_score is not None:  # what the ponder has found so far
+                publish(engine.last_depth, engine.last_score, list(engine.pv))
+            request._stop.wait()
+        finally:
+            engine.on_iteration = None
+
@@ -0,0 +1,111 @@
+"""Vectorised version of Engine.static_eval for scoring many positions at once.
+
+Positions are handled as arrays of (black, white) uint64 bitboards; every
+feature of the single-position evaluation becomes either a popcount or a
+dot product with a precomputed (64, 4) weight matrix.
+"""
+import numpy as np
+
+from board import DIRECTIONS, Board
+from config import BLACK
+from engine import CORNERS, EDGES, EXACT_SCALE, STAB, PHASE_WEIGHTS
+
+# columns: corner, edge (corners count twice, as in static_eval), stability, disc
+FEATURE_WEIGHTS = np.array(
+    [[CORNERS >> sq & 1,
+      (EDGES >> sq & 1) + (CORNERS >> sq & 1),
+      STAB[sq // 8][sq % 8],
+      1] for sq in range(64)],
+    dtype=np.int64,
+)
+PHASE_TABLE = np.array(PHASE_WEIGHTS, dtype=np.int64)  # (65, 4)
+
+_DIRECTIONS = tuple((np.uint64(abs(shift)), shift > 0, np.uint64(mask))
+                    for shift, mask in DIRECTIONS)
+
+
+def to_bitboards(positions):
+    """(black, white) uint64 arrays from Boards, (N, 2) bitboards or (N, 64) cells.
+
+    Cells use 1 for BLACK, -1 for WHITE and 0 for empty, indexed r * 8 + c.
+    """
+    if len(positions) and isinstance(positions[0], Board):
+        black = np.fromiter((b.black for b in positions), dtype=np.uint64, count=len(positions))
+        white = np.fromiter((b.white for b in positions), dtype=np.uint64, count=len(positions))
+        return black, white
+    arr = np.asarray(positions)
+    if arr.ndim == 2 and arr.shape[1] == 2:
+        arr = arr.astype(np.uint64, copy=False)
+        return arr[:, 0].copy(), arr[:, 1].copy()
+    if arr.ndim == 2 and arr.shape[1] == 64:
+        return _pack(arr == 1), _pack(arr == -1)
+    raise ValueError(f"expected Boards, (N, 2) bitboards or (N, 64) cells, got shape {arr.shape}")
+
+
+def _pack(cells):
+    packed = np.packbits(cells.astype(np.uint8), axis=1, bitorder='little')
+    return packed.view('<u8')[:, 0].astype(np.uint64)
+
+
+def unpack(bitboards):
+    """(N, 64) uint8 cell indicators of an array of bitboards."""
+    raw = np.ascontiguousarray(bitboards, dtype='<u8').view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(raw, axis=1, bitorder='little')
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(x):
+        return np.bitwise_count(x).astype(np.int64)
+else:  # NumPy < 2.0
+    def popcount(x):
+        return unpack(x).sum(axis=1, dtype=np.int64)
+
+
+def legal_moves_batch(own, opp):
+    """board.legal_moves over arrays of bitboards."""
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for shift, left, mask in _DIRECTIONS:
+        o = opp & mask
+        if left:
+            x = (own << shift) & o
+            for _ in range(5):
+                x |= (x << shift) & o
+            moves |= (x << shift) & mask & empty
+        else:
+            x = (own >> shift) & o
+            for _ in range(5):
+                x |= (x >> shift) & o
+            moves |= (x >> shift) & mask & empty
+    return moves
+
+
+def evaluate_batch(positions, color, strength: int = 4, patterns=None):
+    """Engine(color, strength).static_eval for every position, as an int64 array.
+
+    Strength 5 needs the engine's PatternWeights.  It scores Boards from
+    their side to move, as static_eval does, and arrays as if `color` were
+    to move, since bitboards do not say whose turn it is.
+    """
+    black, white = to_bitboards(positions)
+    me, opp = (black, white) if color == BLACK else (white, black)
+    if strength >= 5:
+        if not (len(positions) and isinstance(positions[0], Board)):
+            return patterns.evaluate_batch(me, opp)
+        flip = np.fromiter((b.current_player != color for b in positions), dtype=bool,
+                           count=len(positions))
+        # evaluate from the side to move, then back to `color`, as static_eval does
+        score = patterns.evaluate_batch(np.where(flip, opp, me), np.where(flip, me, opp))
+        return np.where(flip, -score, score)
+    if strength == 1:
+        return (popcount(me) - popcount(opp)) * EXACT_SCALE
+
+    mob_w, cor_w, edge_w, stab_w = PHASE_TABLE[popcount(black | white)].T
+    cells = unpack(me).astype(np.int64) - unpack(opp)
+    corners, edges, stability, discs = (cells @ FEATURE_WEIGHTS).T
+    mobility = popcount(legal_moves_batch(me, opp)) - popcount(legal_moves_batch(opp, me))
+
+    score = cor_w * corners + edge_w * edges + mob_w * mobility + discs
+    if strength >= 3:
+        score += stab_w * stability
+    return score
@@ -0,0 +1,225 @@
+"""Reproducible performance benchmarks for the board and the engine.
+
+    python bench.py --out baseline.json          # record a baseline
+    python bench.py --compare baseline.json      # fail on regressions
+
+Every metric is measured on the same fixed opening, midgame and endgame
+positions.  Throughput and timing metrics are compared against the
+baseline with a relative tolerance.  Node and leaf counts should match
+exactly; a difference means search behaviour changed and is reported,
+but it is not counted as a regression.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from board import Board, parse_moves
+from engine import Engine
+from time_control import TimeControl
+
+POSITIONS = {
+    'opening': '',
+    'midgame': 'd3e3f3e2f5c3b3c4c5a3c2g3f1f6h3e6f7g6c6f4',
+    'endgame': 'd3e3f3e2f5c3b3c4c5a3c2g3f1f6h3e6f7g6c6f4e7d8h6f8e8d6d7b5g5g4a5c8h5h4g7h8g8h7a2a1b8h2g2a8c7a4',
+    # 12 empties, for the exact solver
+    'solve': 'd3e3f3e2f5c3b3c4c5a3c2g3f1f6h3e6f7g6c6f4e7d8h6f8e8d6d7b5g5g4a5c8h5h4g7h8g8h7a2a1b8h2g2a8c7a4b2b1',
+}
+PERFT_DEPTH = {'opening': 7, 'midgame': 4, 'endgame': 5}
+SEARCH_DEPTH = {'opening': 7, 'midgame': 5, 'endgame': 6}
+EVAL_CALLS = 20_000
+
+
+def position(name):
+    board = Board()
+    for move in parse_moves(POSITIONS[name]):
+        board.make_move(*move)
+    return board
+
+
+def _perft(board, depth, passed=False):
+    """Perft that plays and takes back every move, leaves included.
+
+    Board.perft counts the last ply from the move mask instead, so its rate
+    is reported separately as bulk_leaves_per_sec; leaves_per_sec keeps
+    measuring make/unmake, comparable with older baselines.
+    """
+    if depth == 0:
+        return 1
+    moves = board.get_valid_moves()
+    if not moves:
+        if passed:
+            return 1  # game over
+        board.pass_turn()
+        leaves = _perft(board, depth - 1, True)
+        board.pass_turn()
+        return leaves
+    leaves = 0
+    for move in moves:
+        undo = board.make_move(*move)
+        leaves += _perft(board, depth - 1)
+        board.unmake_move(undo)
+    return leaves
+
+
+def _timed(fn, repeat):
+    """Best wall time over `repeat` runs, and the last result."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_perft(results, repeat):
+    for name, depth in PERFT_DEPTH.items():
+        board = position(name)
+        seconds, leaves = _timed(lambda: _perft(board, depth), repeat)
+        results[f'perft.{name}.d{depth}.leaves'] = ('count', leaves)
+        results[f'perft.{name}.d{depth}.leaves_per_sec'] = ('rate', leaves / seconds)
+        seconds, _ = _timed(lambda: board.perft(depth), repeat)
+        results[f'perft.{name}.d{depth}.bulk_leaves_per_sec'] = ('rate', leaves / seconds)
+
+
+def bench_eval(results, repeat):
+    for name in PERFT_DEPTH:
+        board = position(name)
+        engine = Engine(board.current_player)
+        seconds, _ = _timed(lambda: [engine.static_eval(board) for _ in range(EVAL_CALLS)], repeat)
+        results[f'eval.{name}.calls_per_sec'] = ('rate', EVAL_CALLS / seconds)
+
+
+def bench_negamax(results, repeat):
+    for name, depth in SEARCH_DEPTH.items():
+        board = position(name)
+        engines = []
+
+        def search():
+            engine = Engine(board.current_player)
+            engines.append(engine)
+            return engine.negamax(board, depth, -float('inf'), float('inf'), 1)
+
+        seconds, _ = _timed(search, repeat)
+        nodes = engines[-1].node_counter
+        results[f'negamax.{name}.d{depth}.nodes'] = ('count', nodes)
+        results[f'negamax.{name}.d{depth}.seconds'] = ('time', seconds)
+        results[f'negamax.{name}.d{depth}.nps'] = ('rate', nodes / seconds)
+
+
+def bench_time_to_depth(results, repeat):
+    for name, depth in SEARCH_DEPTH.items():
+        board = position(name)
+        best = {}
+        for _ in range(repeat):
+            engine = Engine(board.current_player, time_control=TimeControl(),
+                            max_depth=depth, endgame_empties=0)
+            engine.get_best_move(board)
+            for d, _, _, seconds in engine.iterations:
+                best[d] = min(best.get(d, float('inf')), seconds)
+        for d, seconds in sorted(best.items()):
+            results[f'depth.{name}.d{d}.seconds'] = ('time', seconds)
+        # move-ordering quality: these only change when the search does
+        stats = engine.stats.summary()
+        if stats['branching_factor'] is not None:  # needs two completed iterations
+            results[f'depth.{name}.branching_factor'] = ('count', round(stats['branching_factor'], 4))
+        results[f'depth.{name}.first_move_cutoff_rate'] = ('count', round(stats['first_move_cutoff_rate'], 4))
+
+
+def bench_endgame(results, repeat):
+    board = position('solve')
+    solvers = []
+
+    def solve():
+        engine = Engine(board.current_player)
+        solvers.append(engine.endgame)
+        return engine.endgame.solve(*board.bitboards())
+
+    seconds, _ = _timed(solve, repeat)
+    results['endgame.solve.nodes'] = ('count', solvers[-1].nodes)
+    results['endgame.solve.seconds'] = ('time', seconds)
+
+
+SUITES = {
+    'perft': bench_perft,
+    'eval': bench_eval,
+    'negamax': bench_negamax,
+    'depth': bench_time_to_depth,
+    'endgame': bench_endgame,
+}
+
+
+def run(suites, repeat):
+    results = {}
+    for name in suites:
+        SUITES[name](results, repeat)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+        },
+        'results': {name: {'kind': kind, 'value': value} for name, (kind, value) in results.items()},
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Per-metric comparison rows and whether any metric regressed.
+
+    Kinds: 'rate' (higher is better), 'time' (lower is better) and
+    'count' (should match exactly).
+    """
+    rows, regressed = [], False
+    for name, entry in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            rows.append((name, None, entry['value'], 'new'))
+            continue
+        old, new = base['value'], entry['value']
+        status = 'ok'
+        if entry['kind'] == 'count':
+            status = 'ok' if old == new else 'changed'
+        elif entry['kind'] == 'rate' and new < old * (1 - tolerance):
+            status = 'REGRESSION'
+        elif entry['kind'] == 'time' and new > old * (1 + tolerance):
+            status = 'REGRESSION'
+        regressed |= status == 'REGRESSION'
+        rows.append((name, old, new, status))
+    return rows, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Othello engine benchmarks")
+    parser.add_argument('--out', help="write results as JSON to this file")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', help="comma-separated subset of: " + ','.join(SUITES))
+    args = parser.parse_args(argv)
+
+    suites = args.only.split(',') if args.only else list(SUITES)
+    current = run(suites, args.repeat)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if not args.compare:
+        if not args.out:
+            json.dump(current, sys.stdout, indent=2)
+            print()
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    rows, regressed = compare(current, baseline, args.tolerance)
+    for name, old, new, status in rows:
+        old_text = '-' if old is None else f'{old:.6g}'
+        print(f'{name:40} {old_text:>14} {new:>14.6g}  {status}')
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,66 +1,304 @@
-import copy
+import concurrent.futures
 import hashlib
+import random
 from config import ROWS, COLS, BLACK, WHITE
 
+# Square (r, c) lives at bit r * 8 + c.  The masks clear the column a shift
+# would otherwise wrap into.
+FULL = 0xFFFF_FFFF_FFFF_FFFF
+NOT_A = 0xFEFE_FEFE_FEFE_FEFE  # everything but column 0
+NOT_H = 0x7F7F_7F7F_7F7F_7F7F  # everything but column 7
+
+# (shift, mask) per direction; positive shifts go left (towards bit 63)
+DIRECTIONS = (
+    (1, NOT_A), (-1, NOT_H),
+    (8, FULL), (-8, FULL),
+    (9, NOT_A), (7, NOT_H),
+    (-7, NOT_A), (-9, NOT_H),
+)
+
+
+# Zobrist keys: one per (colour, square), plus one XORed in while WHITE is to move
+_rng = random.Random(0x07E110)
+ZOBRIST_BLACK = tuple(_rng.getrandbits(64) for _ in range(64))
+ZOBRIST_WHITE = tuple(_rng.getrandbits(64) for _ in range(64))
+ZOBRIST_FLIP = tuple(b ^ w for b, w in zip(ZOBRIST_BLACK, ZOBRIST_WHITE))
+ZOBRIST_SIDE = _rng.getrandbits(64)
+
+# Board().perft(depth) for depth 0, 1, 2, ...: a pass counts as a ply and a
+# finished game as one leaf
+PERFT_START = (1, 4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288, 24571284)
+
+
+def legal_moves(own, opp):
+    """Bitmask of the empty squares where `own` captures at least one disc."""
+    empty = ~(own | opp) & FULL
+    moves = 0
+    for shift, mask in DIRECTIONS:
+        o = opp & mask
+        if shift > 0:
+            x = (own << shift) & o
+            for _ in range(5):
+                x |= (x << shift) & o
+            moves |= (x << shift) & mask & empty
+        else:
+            shift = -shift
+            x = (own >> shift) & o
+            for _ in range(5):
+                x |= (x >> shift) & o
+            moves |= (x >> shift) & mask & empty
+    return moves
+
+
+def flips(own, opp, sq):
+    """Bitmask of the opponent discs flipped by `own` playing square `sq`."""
+    bit = 1 << sq
+    flipped = 0
+    for shift, mask in DIRECTIONS:
+        run = 0
+        if shift > 0:
+            x = (bit << shift) & mask
+            while x & opp:
+                run |= x
+                x = (x << shift) & mask
+        else:
+            shift = -shift
+            x = (bit >> shift) & mask
+            while x & opp:
+                run |= x
+                x = (x >> shift) & mask
+        if x & own:
+            flipped |= run
+    return flipped
+
+
+def squares(mask):
+    """(row, col) of every set bit, in row-major order."""
+    out = []
+    while mask:
+        low = mask & -mask
+        out.append(divmod(low.bit_length() - 1, COLS))
+        mask ^= low
+    return out
+
+
+def square_name(move):
+    """(row, col) -> 'a1'..'h8' (column letter, row number)."""
+    r, c = move
+    return 'abcdefgh'[c] + str(r + 1)
+
+
+def parse_square(name):
+    """'a1'..'h8' -> (row, col)."""
+    c = 'abcdefgh'.find(name[:1].lower())
+    r = int(name[1]) - 1 if name[1:2].isdigit() else -1
+    if c < 0 or not 0 <= r < ROWS:
+        raise ValueError(f"bad square: {name!r}")
+    return r, c
+
+
+def parse_moves(text):
+    """A concatenated move list such as 'f5d6c3' -> [(row, col), ...]."""
+    text = text.strip()
+    return [parse_square(text[i:i + 2]) for i in range(0, len(text), 2)]
+
+
 class Board:
     def __init__(self):
-        self.grid = [[None for _ in range(COLS)] for _ in range(ROWS)]
-        self.grid[3][3] = WHITE
-        self.grid[4][4] = WHITE
-        self.grid[3][4] = BLACK
-        self.grid[4][3] = BLACK
-        self.current_player = BLACK
+        self.black = (1 << 28) | (1 << 35)  # (3, 4) and (4, 3)
+        self.white = (1 << 27) | (1 << 36)  # (3, 3) and (4, 4)
+        self._player = BLACK
+        self.zobrist = self.compute_zobrist()
         self.selected = None
 
+    @classmethod
+    def from_bitboards(cls, black, white, player=BLACK):
+        board = cls.__new__(cls)
+        board.black = black
+        board.white = white
+        board._player = player
+        board.zobrist = board.compute_zobrist()
+        board.selected = None
+        return board
+
+    @property
+    def current_player(self):
+        return self._player
+
+    @current_player.setter
+    def current_player(self, color):
+        # passes assign this directly, so keep the side-to-move key in step
+        if color != self._player:
+            self.zobrist ^= ZOBRIST_SIDE
+        self._player = color
+
+    @property
+    def grid(self):
+        """8x8 view of the position as colours (None for empty squares)."""
+        grid = [[None for _ in range(COLS)] for _ in range(ROWS)]
+        for r, c in squares(self.black):
+            grid[r][c] = BLACK
+        for r, c in squares(self.white):
+            grid[r][c] = WHITE
+        return grid
+
+    def bitboards(self, color=None):
+        """(own, opp) bitboards from the point of view of `color`."""
+        if color is None:
+            color = self.current_player
+        return (self.black, self.white) if color == BLACK else (self.white, self.black)
+
+    def compute_zobrist(self):
+        """Zobrist key of the position, computed from scratch."""
+        key = ZOBRIST_SIDE if self._player == WHITE else 0
+        for sq in range(64):
+            if self.black >> sq & 1:
+                key ^= ZOBRIST_BLACK[sq]
+            elif self.white >> sq & 1:
+                key ^= ZOBRIST_WHITE[sq]
+        return key
+
     def board_hash(self):
-        flat = ''.join(['.' if cell is None else ('B' if cell == BLACK else 'W') for row in self.grid for cell in row])
+        flat = f'{self.black:016x}{self.white:016x}'
         return hashlib.sha256(flat.encode()).hexdigest()
 
     def copy(self):
-        return copy.deepcopy(self)
+        clone = Board.__new__(Board)
+        clone.black = self.black
+        clone.white = self.white
+        clone._player = self._player
+        clone.zobrist = self.zobrist
+        clone.selected = self.selected
+        return clone
 
     def count_pieces(self):
-        black = sum(row.count(BLACK) for row in self.grid)
-        white = sum(row.count(WHITE) for row in self.grid)
-        return black, white
+        return self.black.bit_count(), self.white.bit_count()
 
     def inside_board(self, r, c):
         return 0 <= r < ROWS and 0 <= c < COLS
 
     def valid_move(self, row, col):
-        if self.grid[row][col] is not None:
+        if not self.inside_board(row, col):
             return False
-        opponent = WHITE if self.current_player == BLACK else BLACK
-        directions = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            found = False
-            while self.inside_board(r,c) and self.grid[r][c] == opponent:
-                r += dr
-                c += dc
-                found = True
-            if found and self.inside_board(r,c) and self.grid[r][c] == self.current_player:
-                return True
-        return False
+        sq = row * COLS + col
+        if (self.black | self.white) >> sq & 1:
+            return False
+        own, opp = self.bitboards()
+        return flips(own, opp, sq) != 0
 
     def get_valid_moves(self):
-        return [(r,c) for r in range(ROWS) for c in range(COLS) if self.valid_move(r,c)]
+        return squares(legal_moves(*self.bitboards()))
+
+    def must_pass(self):
+        """True if the side to move has no move but the opponent has one."""
+        own, opp = self.bitboards()
+        return not legal_moves(own, opp) and legal_moves(opp, own) != 0
+
+    def game_over(self):
+        """True if neither side can move."""
+        own, opp = self.bitboards()
+        return not legal_moves(own, opp) and not legal_moves(opp, own)
+
+    def pass_turn(self):
+        """Hand the move to the opponent; a pass is its own undo."""
+        self.current_player = WHITE if self._player == BLACK else BLACK
+
+    def perft(self, depth, divide=False, workers=1, check=False):
+        """Count the positions `depth` plies ahead.
+
+        A pass counts as a ply and a finished game as one leaf, which gives
+        PERFT_START from the start position.  The last ply is counted from
+        the move mask without playing it (bulk counting).  `divide` returns
+        {move: count} per root move instead, with None for a pass; `workers`
+        > 1 counts the root moves in a process pool; `check` also verifies
+        valid_move, unmake_move and the incremental Zobrist key at every node.
+        """
+        if depth == 0:
+            return {} if divide else 1
+        moves = self.get_valid_moves() or [None]
+        states = []
+        for move in moves:
+            child = self.copy()
+            if move is None:
+                child.pass_turn()
+            else:
+                child.make_move(*move)
+            states.append((child.black, child.white, child.current_player))
+        passed = [move is None for move in moves]
+        n = len(moves)
+        if workers > 1 and n > 1:
+            with concurrent.futures.ProcessPoolExecutor(min(workers, n)) as pool:
+                counts = list(pool.map(_perft_child, states, [depth - 1] * n, passed, [check] * n))
+        else:
+            counts = list(map(_perft_child, states, [depth - 1] * n, passed, [check] * n))
+        return dict(zip(moves, counts)) if divide else sum(counts)
+
+    def _perft(self, depth, passed, check):
+        if check and self.zobrist != self.compute_zobrist():
+            raise AssertionError(f"stale zobrist key at {self.black:#x}/{self.white:#x}")
+        if depth == 0:
+            return 1
+        own, opp = self.bitboards()
+        mask = legal_moves(own, opp)
+        if not mask:
+            if passed:
+                return 1  # neither side can move: the game is over
+            self.pass_turn()
+            leaves = self._perft(depth - 1, True, check)
+            self.pass_turn()
+            return leaves
+        if depth == 1 and not check:
+            return mask.bit_count()
+        leaves = 0
+        for move in squares(mask):
+            if check and not self.valid_move(*move):
+                raise AssertionError(f"valid_move rejects {square_name(move)}")
+            before = (self.black, self.white, self._player, self.zobrist)
+            undo = self.make_move(*move)
+            leaves += self._perft(depth - 1, False, check)
+            self.unmake_move(undo)
+            if check and (self.black, self.white, self._player, self.zobrist) != before:
+                raise AssertionError(f"unmake_move did not restore {square_name(move)}")
+        return leaves
 
     def make_move(self, row, col):
-        if not self.valid_move(row, col):
+        """Play (row, col) in place.
+
+        Returns an undo record for `unmake_move`, or False if the move is illegal.
+        """
+        if not self.inside_board(row, col):
+            return False
+        sq = row * COLS + col
+        if (self.black | self.white) >> sq & 1:
             return False
-        self.grid[row][col] = self.current_player
-        opponent = WHITE if self.current_player == BLACK else BLACK
-        directions = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            to_flip = []
-            while self.inside_board(r,c) and self.grid[r][c] == opponent:
-                to_flip.append((r,c))
-                r += dr
-                c += dc
-            if self.inside_board(r,c) and self.grid[r][c] == self.current_player:
-                for fr, fc in to_flip:
-                    self.grid[fr][fc] = self.current_player
-        self.current_player = opponent
-        return True
+        own, opp = self.bitboards()
+        flipped = flips(own, opp, sq)
+        if not flipped:
+            return False
+        undo = (self.black, self.white, self._player, self.zobrist)
+        key = self.zobrist ^ ZOBRIST_SIDE
+        f = flipped
+        while f:
+            low = f & -f
+            key ^= ZOBRIST_FLIP[low.bit_length() - 1]
+            f ^= low
+        own |= flipped | (1 << sq)
+        opp ^= flipped
+        if self._player == BLACK:
+            self.black, self.white = own, opp
+            self._player = WHITE
+            key ^= ZOBRIST_BLACK[sq]
+        else:
+            self.white, self.black = own, opp
+            self._player = BLACK
+            key ^= ZOBRIST_WHITE[sq]
+        self.zobrist = key
+        return undo
+
+    def unmake_move(self, undo):
+        """Revert the move that returned `undo` from `make_move`."""
+        self.black, self.white, self._player, self.zobrist = undo
+
+
+def _perft_child(state, depth, passed, check):
+    return Board.from_bitboards(*state)._perft(depth, passed, check)
@@ -0,0 +1,216 @@
+"""Opening book: a sorted binary file of searched positions, read through mmap.
+
+File layout (little-endian):
+    header   8s magic, I record count, I reserved            (16 bytes)
+    records  Q canonical key, h score, B move, B depth      (12 bytes each)
+
+Keys are Zobrist keys of the symmetry-canonical orientation of a position
+(see symmetry.canonical_key), so the four equivalent first moves share one
+entry.  Moves are stored in canonical orientation and mapped back on lookup.
+Records are sorted by key and found by binary search straight from the
+mapped file, so opening a book costs nothing however large it is.
+
+Build a book by searching every position up to N plies from the start,
+or the positions along imported lines:
+
+    python book.py build --plies 6 --depth 8 --workers 8 --out book.bin
+    python book.py import lines.txt --plies 16 --depth 8 --out book.bin
+"""
+import argparse
+import concurrent.futures
+import mmap
+import os
+import struct
+
+from board import Board, parse_moves, square_name
+from symmetry import SQUARE_MAP, INVERSE, canonical_key
+from time_control import TimeControl
+
+MAGIC = b'OTHBOOK1'
+HEADER = struct.Struct('<8sII')
+RECORD = struct.Struct('<QhBB')
+
+
+class OpeningBook:
+    """Read-only view of a book file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open_if_exists(cls, path):
+        return cls(path) if path and os.path.exists(path) else None
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if RECORD.unpack_from(self._map, HEADER.size + mid * RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            record = RECORD.unpack_from(self._map, HEADER.size + lo * RECORD.size)
+            if record[0] == key:
+                return record
+        return None
+
+    def probe(self, board):
+        """(move, score, depth) for the side to move, or None if out of book."""
+        key, t = canonical_key(board.black, board.white, board.current_player)
+        record = self._find(key)
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        _, score, move, depth = record
+        return divmod(SQUARE_MAP[INVERSE[t]][move], 8), score, depth
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def read_entries(path):
+    """All records of a book file as {key: (score, move, depth)}."""
+    book = OpeningBook(path)
+    try:
+        entries = {}
+        for i in range(book.count):
+            key, score, move, depth = RECORD.unpack_from(book._map, HEADER.size + i * RECORD.size)
+            entries[key] = (score, move, depth)
+        return entries
+    finally:
+        book.close()
+
+
+def write_book(path, entries):
+    """Write {key: (score, move, depth)} as a sorted book file."""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(entries), 0))
+        for key in sorted(entries):
+            score, move, depth = entries[key]
+            f.write(RECORD.pack(key, max(-32768, min(score, 32767)), move, depth))
+    os.replace(tmp, path)
+
+
+def _analyse(state, depth):
+    """Search one position in a worker; returns (key, score, move, depth) or None."""
+    from engine import Engine
+
+    board = Board.from_bitboards(*state)
+    engine = Engine(board.current_player, time_control=TimeControl(), max_depth=depth)
+    move = engine.get_best_move(board)
+    if move is None:
+        return None
+    key, t = canonical_key(board.black, board.white, board.current_player)
+    score = engine.last_score if engine.last_score is not None else 0
+    return key, int(score), SQUARE_MAP[t][move[0] * 8 + move[1]], engine.last_depth
+
+
+def positions_from_start(plies):
+    """Canonically distinct positions up to `plies` moves from the start."""
+    seen, frontier, out = set(), [Board()], []
+    for ply in range(plies + 1):
+        next_frontier = []
+        for board in frontier:
+            key, _ = canonical_key(board.black, board.white, board.current_player)
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append(board)
+            if ply == plies:
+                continue
+            for move in board.get_valid_moves():
+                child = board.copy()
+                child.make_move(*move)
+                next_frontier.append(child)
+        frontier = next_frontier
+    return out
+
+
+def positions_from_lines(lines, plies):
+    """Positions along each imported line, up to `plies` moves deep.
+
+    Blank lines and lines starting with '#' are skipped and passes are
+    implied.  Raises ValueError naming the line number of a bad move.
+    """
+    out = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip() or line.startswith('#'):
+            continue
+        board = Board()
+        try:
+            moves = parse_moves(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from None
+        for move in moves[:plies]:
+            if board.must_pass():
+                board.pass_turn()
+            out.append(board.copy())
+            if not board.make_move(*move):
+                raise ValueError(f"line {number}: illegal move {square_name(move)}")
+    return out
+
+
+def build(positions, depth, workers=None, entries=None):
+    """Search every position and add the results to `entries`."""
+    entries = {} if entries is None else entries
+    states, seen = [], set()
+    for board in positions:
+        key, _ = canonical_key(board.black, board.white, board.current_player)
+        if key in seen or entries.get(key, (0, 0, -1))[2] >= depth:
+            continue
+        seen.add(key)
+        states.append((board.black, board.white, board.current_player))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_analyse, states, [depth] * len(states), chunksize=4):
+            if result is not None:
+                key, score, move, reached = result
+                entries[key] = (score, move, reached)
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an opening book")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('build', 'import'):
+        p = sub.add_parser(name)
+        if name == 'import':
+            p.add_argument('lines', help="file with one move list per line, e.g. f5d6c3")
+        p.add_argument('--plies', type=int, default=4)
+        p.add_argument('--depth', type=int, default=6)
+        p.add_argument('--workers', type=int, default=None)
+        p.add_argument('--out', default='book.bin')
+        p.add_argument('--merge', action='store_true', help="keep the entries already in --out")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        positions = positions_from_start(args.plies)
+    else:
+        with open(args.lines) as f:
+            try:
+                positions = positions_from_lines(f, args.plies)
+            except ValueError as e:
+                parser.error(f"{args.lines}: {e}")
+
+    entries = read_entries(args.out) if args.merge and os.path.exists(args.out) else {}
+    entries = build(positions, args.depth, args.workers, entries)
+    write_book(args.out, entries)
+    print(f"{args.out}: {len(entries)} positions")
+
+
+if __name__ == '__main__':
+    main()
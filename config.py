@@ -1,5 +1,3 @@
-import pygame
-
 # Constants
 MENU_WIDTH = 180
 BOARD_WIDTH = 640
@@ -7,6 +5,17 @@ WIDTH, HEIGHT = BOARD_WIDTH + MENU_WIDTH, 640
 ROWS, COLS = 8, 8
 SQUARE_SIZE = BOARD_WIDTH // COLS
 DEPTH = 5
+AI_MOVE_TIME = 0.5  # seconds per AI move
+AI_STRENGTH = 4
+HINT_TIME = 1.5
+BOOK_PATH = "book.bin"
+# fitted pattern weights for engine strength 5 (python patterns.py fit ...)
+PATTERN_PATH = "patterns.bin"
+# analysis cache shared by the AI, eval-bar and hint engines (None: memory only)
+CACHE_PATH = "analysis_cache.bin"
+CACHE_SIZE_MB = 64
+# finished games are appended here (game_record.py format; None: not saved)
+GAMES_PATH = "games.bin"
 
 # Colors
 GREEN = (0, 150, 0)
@@ -21,10 +30,3 @@ HINT_COLOR = (209, 255, 189)
 SELECT_COLOR = (255, 215, 0)
 BLUE = (50, 150, 255)
 RED = (255, 50, 50)
-
-# Initialize Pygame
-pygame.init()
-WIN = pygame.display.set_mode((WIDTH + 40, HEIGHT))
-pygame.display.set_caption("Othello Enhanced")
-FONT = pygame.font.SysFont("arial", 24, bold=True)
-BUTTON_FONT = pygame.font.SysFont("arial", 18, bold=True)
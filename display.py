@@ -0,0 +1,9 @@
+import pygame
+from config import WIDTH, HEIGHT
+
+# Initialize Pygame
+pygame.init()
+WIN = pygame.display.set_mode((WIDTH + 40, HEIGHT))
+pygame.display.set_caption("Othello Enhanced")
+FONT = pygame.font.SysFont("arial", 24, bold=True)
+BUTTON_FONT = pygame.font.SysFont("arial", 18, bold=True)
@@ -0,0 +1,225 @@
+import time
+from board import FULL, legal_moves, flips
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# the four 4x4 quadrants, used for parity ordering
+QUADRANTS = (0x0000_0000_0F0F_0F0F, 0x0000_0000_F0F0_F0F0,
+             0x0F0F_0F0F_0000_0000, 0xF0F0_F0F0_0000_0000)
+CORNER_MASK = (1 << 0) | (1 << 7) | (1 << 56) | (1 << 63)
+
+# below these empties the solver drops the table / fastest-first ordering,
+# whose overhead costs more than it saves near the leaves
+TT_MIN_EMPTIES = 7
+FASTEST_FIRST_EMPTIES = 7
+
+
+def final_score(own, opp):
+    """Disc differential of a finished game; empty squares go to the winner."""
+    diff = own.bit_count() - opp.bit_count()
+    if diff > 0:
+        return diff + 64 - (own | opp).bit_count()
+    if diff < 0:
+        return diff - 64 + (own | opp).bit_count()
+    return 0
+
+
+def bit_squares(mask):
+    out = []
+    while mask:
+        low = mask & -mask
+        out.append(low.bit_length() - 1)
+        mask ^= low
+    return out
+
+
+class EndgameSolver:
+    """Exact solver for the last few empties, scoring by disc differential.
+
+    Positions are passed as (own, opp) bitboards from the side to move.
+    `solve` first settles win/loss/draw with a null-window search around 0
+    and then searches for the exact score on the winning side of it.
+    """
+
+    def __init__(self, tt_size_mb: float = 4):
+        self.transposition = TranspositionTable(tt_size_mb)
+        self.nodes = 0
+        self.time = 0.0
+        self.solves = 0
+        self._deadline = None
+        self._stop_event = None
+        self._node_limit = None
+        self._aborted = False
+
+    def stats(self):
+        return {
+            'solves': self.solves,
+            'nodes': self.nodes,
+            'time': self.time,
+            'nps': self.nodes / self.time if self.time else 0.0,
+        }
+
+    def solve(self, own, opp, deadline: float | None = None, stop_event=None,
+              max_nodes: int | None = None):
+        """Return (score, square) for the side to move, or None if interrupted.
+
+        `square` is None when the side to move has to pass.
+        """
+        start = time.time()
+        self._deadline = deadline
+        self._stop_event = stop_event
+        self._node_limit = None if max_nodes is None else self.nodes + max_nodes
+        self._aborted = False
+        self.transposition.new_search()
+        try:
+            wld, move = self._root(own, opp, -1, 1)
+            if self._aborted:
+                return None
+            if wld > 0:
+                score, move = self._root(own, opp, 0, 65)
+            elif wld < 0:
+                score, move = self._root(own, opp, -65, 0)
+            else:
+                score = 0
+            if self._aborted:
+                return None
+            self.solves += 1
+            return score, move
+        finally:
+            self.time += time.time() - start
+
+    def _root(self, own, opp, alpha, beta):
+        moves = legal_moves(own, opp)
+        if not moves:
+            return self._search(own, opp, alpha, beta, False), None
+        empties = 64 - (own | opp).bit_count()
+        best_score, best_move = -65, None
+        for sq in self._order(own, opp, moves, empties, None):
+            f = flips(own, opp, sq)
+            score = -self._search(opp ^ f, own | f | (1 << sq), -beta, -alpha, False)
+            if self._aborted:
+                return 0, None
+            if score > best_score:
+                best_score, best_move = score, sq
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best_score, best_move
+
+    def _search(self, own, opp, alpha, beta, passed):
+        self.nodes += 1
+        if not self.nodes & 1023 and self._limits_hit():
+            self._aborted = True
+        if self._aborted:
+            return 0
+
+        empty = ~(own | opp) & FULL
+        empties = empty.bit_count()
+        if empties <= 3:
+            return self._solve_small(own, opp, alpha, beta, empty, passed)
+
+        moves = legal_moves(own, opp)
+        if not moves:
+            if passed or not legal_moves(opp, own):
+                return final_score(own, opp)
+            return -self._search(opp, own, -beta, -alpha, True)
+
+        key = hint = None
+        alpha_orig = alpha
+        if empties >= TT_MIN_EMPTIES:
+            key = hash((own, opp)) & FULL
+            cache = self.transposition.probe(key)
+            if cache:
+                tt_score, hint, _, tt_flag = cache
+                if tt_flag == EXACT:
+                    return tt_score
+                if tt_flag == LOWER:
+                    alpha = max(alpha, tt_score)
+                elif tt_flag == UPPER:
+                    beta = min(beta, tt_score)
+                if alpha >= beta:
+                    return tt_score
+
+        best_score, best_move = -65, None
+        for sq in self._order(own, opp, moves, empties, hint):
+            f = flips(own, opp, sq)
+            score = -self._search(opp ^ f, own | f | (1 << sq), -beta, -alpha, False)
+            if self._aborted:
+                return 0
+            if score > best_score:
+                best_score, best_move = score, sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if key is not None:
+            if best_score <= alpha_orig:
+                flag = UPPER
+            elif best_score >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.transposition.store(key, best_score, best_move, empties, flag)
+        return best_score
+
+    def _solve_small(self, own, opp, alpha, beta, empty, passed):
+        """Last 1-3 empties: try each square directly, no move generator."""
+        best_score = -65
+        for sq in self._parity_squares(empty):
+            f = flips(own, opp, sq)
+            if not f:
+                continue
+            rest = empty & ~(1 << sq)
+            nown, nopp = own | f | (1 << sq), opp ^ f
+            if rest:
+                self.nodes += 1
+                score = -self._solve_small(nopp, nown, -beta, -alpha, rest, False)
+            else:
+                score = final_score(nown, nopp)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        return best_score
+        if best_score == -65:  # no move: pass or game over
+            if passed:
+                return final_score(own, opp)
+            return -self._solve_small(opp, own, -beta, -alpha, empty, True)
+        return best_score
+
+    @staticmethod
+    def _parity_squares(empty):
+        """Empty squares, those alone in their quadrant first."""
+        squares = bit_squares(empty)
+        if len(squares) < 3:
+            return squares
+        odd = [sq for sq in squares if any((1 << sq) & q and (empty & q).bit_count() & 1
+                                           for q in QUADRANTS)]
+        return odd + [sq for sq in squares if sq not in odd]
+
+    def _order(self, own, opp, moves, empties, hint):
+        """TT move, then fastest-first (fewest replies) or parity ordering."""
+        empty = ~(own | opp) & FULL
+        odd = 0
+        for q in QUADRANTS:
+            if (empty & q).bit_count() & 1:
+                odd |= q
+        squares = bit_squares(moves)
+        if empties > FASTEST_FIRST_EMPTIES:
+            def key(sq):
+                f = flips(own, opp, sq)
+                replies = legal_moves(opp ^ f, own | f | (1 << sq)).bit_count()
+                return (sq != hint, replies, not (odd >> sq & 1), not (CORNER_MASK >> sq & 1))
+        else:
+            def key(sq):
+                return (sq != hint, not (odd >> sq & 1), not (CORNER_MASK >> sq & 1))
+        squares.sort(key=key)
+        return squares
+
+    def _limits_hit(self):
+        if self._stop_event is not None and self._stop_event.is_set():
+            return True
+        if self._deadline is not None and time.time() >= self._deadline:
+            return True
+        return self._node_limit is not None and self.nodes >= self._node_limit
@@ -1,131 +1,229 @@
 import copy
 import concurrent.futures
+import logging
+import multiprocessing
 import threading
 import time
-from board import Board
-from config import BLACK, WHITE
+import zlib
+from time import perf_counter
+from board import Board, legal_moves
+from book import OpeningBook
+from endgame import EndgameSolver
+from patterns import SCALE, PatternWeights, load as load_patterns
+from config import BLACK, WHITE, PATTERN_PATH
+from search_stats import SamplingProfiler, SearchStats, CUTOFF_SLOTS
+from shared_table import SharedTable
+from symmetry import SQUARE_MAP, INVERSE, canonical_key
+from time_control import TimeControl
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+logger = logging.getLogger(__name__)
+
+MAX_PLY = 64
+ASPIRATION_WINDOW = 50
+ENDGAME_SHARE = 0.5  # fraction of the move budget the exact solver may use
+# a pessimistic guess at the solver's time for 10 empties (about twice the
+# median here), and its growth per extra empty; a solve that would not fit
+# its share of the budget is not started
+SOLVE_SECONDS_10 = 0.15
+SOLVE_GROWTH = 2.5
+# canonical keys cost ~8us a node; past the first few moves a position's
+# images no longer turn up in the same tree, so they stop paying for themselves
+SYMMETRY_DISCS = 10
+# solved positions are reported at SCALE units per disc of final margin, the
+# unit of the strength 1 and 5 evaluators, so they span the heuristic's ±1000 range
+EXACT_SCALE = SCALE
+SCORE_RANGE = 64 * EXACT_SCALE  # a whole-board margin; heuristic scores rarely pass it
+EVAL_VERSION = 2  # bump when static_eval changes, so saved tables are dropped
+
+CORNERS = (1 << 0) | (1 << 7) | (1 << 56) | (1 << 63)
+EDGES = 0xFF00_0000_0000_00FF | 0x8181_8181_8181_8181
+
+STAB = [
+    [4, -3, 2, 2, 2, 2, -3, 4],
+    [-3, -4, -1, -1, -1, -1, -4, -3],
+    [2, -1, 1, 0, 0, 1, -1, 2],
+    [2, -1, 0, 1, 1, 0, -1, 2],
+    [2, -1, 0, 1, 1, 0, -1, 2],
+    [2, -1, 1, 0, 0, 1, -1, 2],
+    [-3, -4, -1, -1, -1, -1, -4, -3],
+    [4, -3, 2, 2, 2, 2, -3, 4],
+]
+# static move-ordering priority: corners first, X-squares last
+SQUARE_PRIORITY = (
+    100, -20, 10, 5, 5, 10, -20, 100,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    10, -2, 1, 1, 1, 1, -2, 10,
+    5, -2, 1, 0, 0, 1, -2, 5,
+    5, -2, 1, 0, 0, 1, -2, 5,
+    10, -2, 1, 1, 1, 1, -2, 10,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    100, -20, 10, 5, 5, 10, -20, 100,
+)
+KILLER_BONUS = 1 << 20
+
+# one mask per distinct STAB weight, so the table is scored with popcounts
+STAB_MASKS = tuple(
+    (val, sum(1 << (r * 8 + c) for r in range(8) for c in range(8) if STAB[r][c] == val))
+    for val in sorted({v for row in STAB for v in row}) if val
+)
+
+
+def _phase_weights(total):
+    phase = total / 64
+    return (
+        int(10 * (1 - phase)) + 1,
+        int(100 * (1 - phase)) + 50,
+        int(20 * (1 - phase)) + 5,
+        int(40 * phase) + 10
+    )
+
+
+# (mobility, corner, edge, stability) weights by number of discs on the board
+PHASE_WEIGHTS = tuple(_phase_weights(total) for total in range(65))
 
 def score_move(engine, board, move):
     """Heuristic used for move-ordering."""
-    clone = board.copy()
-    clone.make_move(*move)
     r, c = move
 
     if move in [(0, 0), (0, 7), (7, 0), (7, 7)]:
         return 10_000
-    if r in (0, 7) or c in (0, 7):
-        return 3_000 + engine.static_eval(clone)
     if (r, c) in [(1, 1), (1, 6), (6, 1), (6, 6)]:
         return -1_000
-    return engine.static_eval(clone)
+    undo = board.make_move(r, c)
+    score = engine.static_eval(board)
+    board.unmake_move(undo)
+    if r in (0, 7) or c in (0, 7):
+        return 3_000 + score
+    return score
+
+
+def evaluation_stamp(strength):
+    """An int identifying the scores of Engine(strength=...), for SharedTable."""
+    strength = max(1, min(strength, 5))
+    weights = 0
+    if strength == 5:
+        try:
+            patterns = load_patterns(PATTERN_PATH)
+        except FileNotFoundError:
+            strength = 4  # as the engine falls back
+        else:
+            weights = zlib.crc32(b''.join(t.tobytes() for t in patterns.tables))
+    return weights << 32 | EVAL_VERSION << 8 | strength
+
 
 class Engine:
-    def __init__(self, color, strength: int = 4, time_limit: float = 0.5):
+    def __init__(self, color, strength: int = 4, time_limit: float = 0.5,
+                 tt_size_mb: float = 16, tt_policy: str = "depth", workers: int = 1,
+                 time_control: TimeControl | None = None, eval_order_plies: int = 0,
+                 endgame_empties: int = 12, max_depth: int | None = None,
+                 book: OpeningBook | None = None, transposition=None,
+                 symmetry_discs: int = SYMMETRY_DISCS, timing: bool = False,
+                 profile_interval: float | None = None,
+                 patterns: PatternWeights | None = None, multi_pv: int = 1):
         self.color = color
-        self.strength = max(1, min(strength, 4))
+        self.strength = max(1, min(strength, 5))
+        # strength 5 scores leaves with fitted pattern weights (patterns.py)
+        if self.strength == 5 and patterns is None:
+            try:
+                patterns = load_patterns(PATTERN_PATH)
+            except FileNotFoundError:
+                logger.warning("no pattern weights at %s (python patterns.py fit ...); "
+                               "playing at strength 4", PATTERN_PATH)
+                self.strength = 4
+        self.patterns = patterns
         self.time_limit = time_limit
-        self.eval_bar_score = 0
-        self.eval_thread = None
-        self.eval_cancel = threading.Event()
-        self.evaluating = False
-        self.transposition: dict[str, dict] = {}
+        # defaults to a fixed time_limit per move
+        self.time_control = time_control or TimeControl(move_time=time_limit)
+        self.tt_size_mb = tt_size_mb
+        self.tt_policy = tt_policy
+        # pass a shared_table.SharedTable to share analysis between engines
+        if transposition is None:
+            transposition = TranspositionTable(tt_size_mb, tt_policy)
+        self.transposition = transposition
+        # positions with up to this many discs use symmetry-canonical keys
+        self.symmetry_discs = symmetry_discs
+        # workers > 1 splits the root search across a process pool
+        self.workers = max(1, workers)
+        self._pool = None
+        self._pool_search = None
         self.node_counter: int = 0
+        # search limits, set per search; _aborted unwinds the current search
+        self._deadline: float | None = None
+        self._max_nodes: int | None = None
+        self._aborted = False
+        # triangular PV array: row p holds the variation from ply p onwards
+        self._pv = [[None] * (MAX_PLY + 1) for _ in range(MAX_PLY + 1)]
+        self._pv_len = [0] * (MAX_PLY + 1)
+        self.pv: list[tuple[int, int]] = []  # principal variation of the last search
+        # multi_pv > 1 scores that many root moves exactly; lines holds the
+        # last search's (score, move, pv), best first
+        self.multi_pv = max(1, multi_pv)
+        self.lines: list[tuple[int, tuple[int, int], list[tuple[int, int]]]] = []
+        self.last_score = None
+        self.last_depth = 0
+        self.last_exact = False  # last_score is a solved margin, EXACT_SCALE per disc
+        self.iterations: list[tuple[int, int, int, float]] = []
+        # called as on_iteration(depth, score, pv) whenever a result is ready
+        self.on_iteration = None
+        # statistics of the current or last search; on_search(stats) is
+        # called when a search finishes.  timing adds per-section clocks,
+        # profile_interval samples the search thread's stack.
+        self.timing = timing
+        self.profile_interval = profile_interval
+        self.stats = SearchStats(timing)
+        self.on_search = None
+        # move ordering: nodes above eval_order_plies use the score_move
+        # evaluation, the rest killers + history + SQUARE_PRIORITY
+        self.eval_order_plies = eval_order_plies
+        self._killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self._history = [[0] * 64, [0] * 64]  # [BLACK, WHITE][square]
+        # positions with this many empties or fewer are solved exactly
+        self.endgame_empties = endgame_empties
+        self.endgame = EndgameSolver()
+        self.max_depth = max_depth  # cap on iterative deepening (None = time only)
+        self.book = book
+        # background search of the predicted reply: (thread, position, stop, result)
+        self._ponder = None
+        # held by the one search running on this engine's state (stats, PV, counters)
+        self._searching = threading.Lock()
+        self.ponder_hits = 0
+        self.ponder_misses = 0
 
     @staticmethod
     def _dynamic_weights(board):
-        total = sum(cell is not None for row in board.grid for cell in row)
-        phase = total / 64
-        return (
-            int(10 * (1 - phase)) + 1,
-            int(100 * (1 - phase)) + 50,
-            int(20 * (1 - phase)) + 5,
-            int(40 * phase) + 10
-        )
+        return PHASE_WEIGHTS[(board.black | board.white).bit_count()]
 
 
-    def evaluate_position_async(self, board):
-        active = threading.enumerate()
-        print("Eval threads:", sum(t.name.startswith("Thread-") for t in active))
-        if self.evaluating:  # ← still running → do nothing
-            return
-
-        # signal any previous run; DON'T clear self.evaluating here
-        self.eval_cancel.set()
-
-        # create a fresh cancel flag & mark ourselves running
-        self.eval_cancel = threading.Event()
-        self.evaluating = True
-
-        def task():
-            depth = 1
-            cloned = board.copy()
-            while not self.eval_cancel.is_set():
-                score, _ = self.negamax(
-                    cloned, depth,
-                    -float('inf'), float('inf'), 1,
-                    multithreaded=False,
-                    stop_event=self.eval_cancel
-                )
-                if depth >= 5:
-                    self.eval_bar_score = score
-                depth += 1
-                print(depth)
-                time.sleep(0.05)
-            self.evaluating = False  # ← mark finished
-
-        self.eval_thread = threading.Thread(target=task, daemon=True)
-        self.eval_thread.start()
-
-    def stop_eval(self):
-        """Request the background-eval thread to exit (non-blocking)."""
-        self.eval_cancel.set()  # flag thread to stop
-        # DON'T flip self.evaluating here—wait for thread to end
-
     def static_eval(self, board):
+        if self.strength == 5:
+            player = board.current_player
+            score = self.patterns.evaluate(*board.bitboards(player))
+            return score if player == self.color else -score
+
         if self.strength == 1:
             black, white = board.count_pieces()
-            return (white - black) if self.color == WHITE else (black - white)
+            return ((white - black) if self.color == WHITE else (black - white)) * EXACT_SCALE
 
         mob_w, cor_w, edge_w, stab_w = self._dynamic_weights(board)
 
-        corners = [(0, 0), (0, 7), (7, 0), (7, 7)]
-        edges = [(0, c) for c in range(8)] + [(7, c) for c in range(8)] + \
-                [(r, 0) for r in range(8)] + [(r, 7) for r in range(8)]
-        my_corners = sum(board.grid[r][c] == self.color for r, c in corners)
-        opp_corners = sum(board.grid[r][c] not in (None, self.color) for r, c in corners)
-        my_edges = sum(board.grid[r][c] == self.color for r, c in edges)
-        opp_edges = sum(board.grid[r][c] not in (None, self.color) for r, c in edges)
-
-        current = board.current_player
-        board.current_player = self.color
-        my_moves = len(board.get_valid_moves())
-        board.current_player = WHITE if self.color == BLACK else BLACK
-        opp_moves = len(board.get_valid_moves())
-        board.current_player = current
-
-        black, white = board.count_pieces()
-        my_pieces = white if self.color == WHITE else black
-        opp_pieces = black if self.color == WHITE else white
+        me, opp = board.bitboards(self.color)
+        my_corners = (me & CORNERS).bit_count()
+        opp_corners = (opp & CORNERS).bit_count()
+        # corners sit on two edges each, so they count twice here
+        my_edges = (me & EDGES).bit_count() + my_corners
+        opp_edges = (opp & EDGES).bit_count() + opp_corners
+
+        my_moves = legal_moves(me, opp).bit_count()
+        opp_moves = legal_moves(opp, me).bit_count()
+
+        my_pieces = me.bit_count()
+        opp_pieces = opp.bit_count()
 
         stability_score = 0
         if self.strength >= 3:
-            stab = [
-                [4, -3, 2, 2, 2, 2, -3, 4],
-                [-3, -4, -1, -1, -1, -1, -4, -3],
-                [2, -1, 1, 0, 0, 1, -1, 2],
-                [2, -1, 0, 1, 1, 0, -1, 2],
-                [2, -1, 0, 1, 1, 0, -1, 2],
-                [2, -1, 1, 0, 0, 1, -1, 2],
-                [-3, -4, -1, -1, -1, -1, -4, -3],
-                [4, -3, 2, 2, 2, 2, -3, 4],
-            ]
-            for r in range(8):
-                for c in range(8):
-                    val = stab[r][c]
-                    if board.grid[r][c] == self.color:
-                        stability_score += val
-                    elif board.grid[r][c] not in (None, self.color):
-                        stability_score -= val
+            for val, mask in STAB_MASKS:
+                stability_score += val * ((me & mask).bit_count() - (opp & mask).bit_count())
 
         return (
             cor_w * (my_corners - opp_corners)
@@ -135,105 +233,675 @@ class Engine:
             + (stab_w * stability_score if self.strength >= 3 else 0)
         )
 
+    def static_eval_batch(self, positions):
+        """static_eval for many positions at once (requires NumPy).
+
+        `positions` is a sequence of Boards, an (N, 2) uint64 array of
+        (black, white) bitboards or an (N, 64) int8 array of cells.
+        """
+        from batch_eval import evaluate_batch
+        return evaluate_batch(positions, self.color, self.strength, self.patterns)
+
     def negamax(self, board, depth, alpha, beta, color,
-                multithreaded=True, stop_event: threading.Event | None = None):
+                multithreaded=True, stop_event: threading.Event | None = None,
+                ply: int = 0):
+        """Principal variation search from `board`, `ply` moves below the root.
+
+        The principal variation found below this node is left in
+        self._pv[ply][ply:self._pv_len[ply]].
+        """
+        self._pv_len[ply] = ply
 
         # ---------- EARLY CANCEL ----------
-        if stop_event is not None and stop_event.is_set():
+        if self._aborted:
             return 0, None  # dummy score, caller will ignore
+        if not self.node_counter & 63 and self._limits_hit(stop_event):
+            self._aborted = True
+            return 0, None
         # ----------------------------------
 
-        key = board.board_hash() + str(board.current_player)
-        cache = self.transposition.get(key)
-        if cache and cache['depth'] >= depth:
-            return cache['score'], cache['move']
-
+        stats = self.stats
+        timing = stats.timing
+        if timing:
+            started = perf_counter()
+        if (board.black | board.white).bit_count() <= self.symmetry_discs:
+            # symmetric images of an opening position share one entry, with
+            # the move stored in the canonical orientation
+            key, t = canonical_key(board.black, board.white, board.current_player)
+        else:
+            key, t = board.zobrist, 0
+        alpha_orig = alpha
+        cache = self.transposition.probe(key)
+        stats.tt_probes += 1
+        if timing:
+            stats.hash_time += perf_counter() - started
+        hint = None
+        if cache:
+            stats.tt_hits += 1
+            tt_score, tt_move, tt_depth, tt_flag = cache
+            if tt_move is not None:
+                hint = divmod(SQUARE_MAP[INVERSE[t]][tt_move], 8)
+            if tt_depth >= depth:
+                if tt_flag == LOWER:
+                    alpha = max(alpha, tt_score)
+                elif tt_flag == UPPER:
+                    beta = min(beta, tt_score)
+                if tt_flag == EXACT or alpha >= beta:
+                    stats.tt_cutoffs += 1
+                    if hint is not None:
+                        self._pv[ply][ply] = hint
+                        self._pv_len[ply] = ply + 1
+                    return tt_score, hint
+
+        if timing:
+            started = perf_counter()
         moves = board.get_valid_moves()
+        if timing:
+            stats.movegen_time += perf_counter() - started
         if depth == 0 or not moves:
+            stats.evals += 1
+            if timing:
+                started = perf_counter()
+                score = color * self.static_eval(board)
+                stats.eval_time += perf_counter() - started
+                return score, None
             return color * self.static_eval(board), None
 
-        if self.strength == 4:
-            hint = cache['move'] if cache else None
-            if hint in moves:
-                moves.remove(hint)
-                moves = [hint] + sorted(moves, key=lambda m: score_move(self, board, m), reverse=True)
-            else:
-                moves.sort(key=lambda m: score_move(self, board, m), reverse=True)
-        else:
+        if ply < self.eval_order_plies:
             moves.sort(key=lambda m: score_move(self, board, m), reverse=True)
+        else:
+            self._order_moves(board, moves, ply)
+        if self.strength >= 4 and hint in moves:
+            moves.remove(hint)
+            moves.insert(0, hint)
 
         best_move = None
         max_score = -float('inf')
-        for move in moves:
+        pv = self._pv[ply]
+        child_pv = self._pv[ply + 1]
+        for i, move in enumerate(moves):
             self.node_counter += 1
-            child = board.copy()
-            child.make_move(*move)
-            score, _ = self.negamax(child, depth - 1, -beta, -alpha, -color,
-                                    multithreaded, stop_event)
-            score = -score
+            undo = board.make_move(*move)
+            if i == 0:
+                score, _ = self.negamax(board, depth - 1, -beta, -alpha, -color,
+                                        multithreaded, stop_event, ply + 1)
+                score = -score
+            else:
+                # null window: prove this move is no better than alpha
+                score, _ = self.negamax(board, depth - 1, -alpha - 1, -alpha, -color,
+                                        multithreaded, stop_event, ply + 1)
+                score = -score
+                if alpha < score < beta and not self._aborted:
+                    score, _ = self.negamax(board, depth - 1, -beta, -score, -color,
+                                            multithreaded, stop_event, ply + 1)
+                    score = -score
+            board.unmake_move(undo)
+            if self._aborted:
+                return 0, None  # partial result: don't store it
             if score > max_score:
                 max_score = score
                 best_move = move
+                pv[ply] = move
+                end = self._pv_len[ply + 1]
+                pv[ply + 1:end] = child_pv[ply + 1:end]
+                self._pv_len[ply] = end
             alpha = max(alpha, score)
             if alpha >= beta:
+                self._record_cutoff(board, move, depth, ply)
+                stats.cutoffs += 1
+                stats.cutoff_index[min(i, CUTOFF_SLOTS - 1)] += 1
                 break
 
-        self.transposition[key] = {'score': max_score, 'move': best_move, 'depth': depth}
+        if max_score <= alpha_orig:
+            flag = UPPER
+        elif max_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if timing:
+            started = perf_counter()
+        self.transposition.store(key, max_score, SQUARE_MAP[t][best_move[0] * 8 + best_move[1]],
+                                 depth, flag)
+        if timing:
+            stats.hash_time += perf_counter() - started
         return max_score, best_move
 
-    def get_best_move(self, board):
-        """Return the best move found within self.time_limit.
+    def _order_moves(self, board, moves, ply):
+        """Killers first, then by history score plus static square priority."""
+        killers = self._killers[ply]
+        history = self._history[board.current_player != BLACK]
+
+        def key(m):
+            sq = m[0] * 8 + m[1]
+            return history[sq] + SQUARE_PRIORITY[sq] + (KILLER_BONUS if m in killers else 0)
+
+        moves.sort(key=key, reverse=True)
+
+    def _record_cutoff(self, board, move, depth, ply):
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self._history[board.current_player != BLACK][move[0] * 8 + move[1]] += depth * depth
+
+    def _limits_hit(self, stop_event):
+        """Polled every 64 nodes: stop request, deadline or node budget."""
+        if stop_event is not None and stop_event.is_set():
+            return True
+        if self._deadline is not None and time.time() >= self._deadline:
+            return True
+        return self._max_nodes is not None and self.node_counter >= self._max_nodes
+
+    def get_best_move(self, board, stop_event: threading.Event | None = None):
+        """Return the best move found within the time control's budget.
         Guarantees at least a depth‑1 search so the engine never skips a turn.
+        The search stops within a few milliseconds of the deadline (or node
+        budget, or `stop_event` being set) and an unfinished iteration is
+        discarded.  If the engine was pondering this position, that search
+        carries on instead of starting over.
+        """
+        if self._ponder is not None:
+            move = self._finish_ponder(board, stop_event)
+            if move is not None:
+                return move
+
+        start = time.time()
+        budget = self.time_control.budget(board)
+        self._deadline = None if budget is None else start + budget
+        self._max_nodes = self.time_control.max_nodes
+        move = self._think(board, stop_event)
+        self.time_control.consume(time.time() - start)
+        return move
+
+    def ponder(self, board):
+        """Search the expected reply in the background.
+
+        `board` is the position after this engine's move.  The reply from
+        the last principal variation is played on a copy and searched with
+        no limit until the next get_best_move: on a hit that search is given
+        the move's budget and its result used, on a miss it is cancelled
+        (the transposition table keeps what it found).  Returns the
+        predicted reply, or None if there is nothing to ponder.
+
+        The ponder search runs on this engine's own search state, so nothing
+        else may search with the engine until get_best_move or stop_ponder
+        has ended it (both do so first); a search started meanwhile raises
+        RuntimeError.
+        """
+        self.stop_ponder()
+        reply = self.pv[1] if len(self.pv) > 1 else None
+        if reply is None and self.book is not None:
+            # after a book move, expect the book reply
+            entry = self.book.probe(board)
+            reply = entry[0] if entry is not None else None
+        if reply is None:
+            # the PV was cut short by a table hit: take the table's move,
+            # keyed and oriented as negamax stores it
+            if (board.black | board.white).bit_count() <= self.symmetry_discs:
+                key, t = canonical_key(board.black, board.white, board.current_player)
+            else:
+                key, t = board.zobrist, 0
+            entry = self.transposition.probe(key)
+            if entry is not None and entry[1] is not None:
+                reply = divmod(SQUARE_MAP[INVERSE[t]][entry[1]], 8)
+        if reply is None or reply not in board.get_valid_moves():
+            return None
+        position = board.copy()
+        position.make_move(*reply)
+        if not position.get_valid_moves():
+            return None
+
+        stop = threading.Event()
+        result = []
+
+        def task():
+            self._deadline = self._max_nodes = None
+            result.append(self._think(position, stop))
+
+        thread = threading.Thread(target=task, daemon=True)
+        self._ponder = (thread, position, stop, result)
+        thread.start()
+        return reply
+
+    @property
+    def pondering(self):
+        """The position being pondered, or None."""
+        return None if self._ponder is None else self._ponder[1]
+
+    def stop_ponder(self):
+        """Cancel a background ponder search, if one is running."""
+        if self._ponder is not None:
+            thread, _, stop, _ = self._ponder
+            self._ponder = None
+            stop.set()
+            thread.join()
+
+    def _finish_ponder(self, board, stop_event):
+        """The pondered move if `board` is the pondered position, else None."""
+        thread, position, stop, result = self._ponder
+        self._ponder = None
+        hit = (board.black, board.white, board.current_player) == \
+            (position.black, position.white, position.current_player)
+        if not hit:
+            self.ponder_misses += 1
+            stop.set()
+            thread.join()
+            return None
+
+        self.ponder_hits += 1
+        start = time.time()
+        budget = self.time_control.budget(board)
+        deadline = None if budget is None else start + budget
+        if self.time_control.max_nodes is not None:
+            self._max_nodes = self.node_counter + self.time_control.max_nodes
+        # the search so far was free; let it run for the move's own budget
+        while thread.is_alive():
+            if deadline is not None and time.time() >= deadline:
+                break
+            if stop_event is not None and stop_event.is_set():
+                break
+            thread.join(0.005)
+        stop.set()
+        thread.join()
+        self.time_control.consume(time.time() - start)
+        return result[0] if result else None
+
+    def _think(self, board, stop_event):
+        """Run one search within the limits already set on the engine,
+        collecting its statistics in self.stats."""
+        if not self._searching.acquire(blocking=False):
+            raise RuntimeError("the engine is already searching (pondering?)")
+        try:
+            return self._think_locked(board, stop_event)
+        finally:
+            self._searching.release()
+
+    def _think_locked(self, board, stop_event):
+        self.stats = stats = SearchStats(self.timing)
+        self.node_counter = 0
+        self.iterations = stats.iterations
+        endgame_nodes = self.endgame.nodes
+        profiler = None
+        if self.profile_interval:
+            profiler = SamplingProfiler(interval=self.profile_interval).start()
+        start = time.time()
+        try:
+            return self._iterate(board, stop_event)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+                stats.profile = profiler.report()
+            stats.seconds = time.time() - start
+            stats.nodes = self.node_counter
+            stats.endgame_nodes = self.endgame.nodes - endgame_nodes
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("search: %s", stats.summary())
+            if self.on_search is not None:
+                self.on_search(stats)
+
+    def _iterate(self, board, stop_event):
+        """Book, depth-1 scan, endgame solver, then iterative deepening.
+
+        In multi-PV mode the book is skipped, since it holds one move per
+        position, and the endgame is solved move by move.
         """
+        self.lines = []
+        self.last_exact = False
         moves = board.get_valid_moves()
         if not moves:
             return None
 
+        if self.book is not None and self.multi_pv == 1:
+            entry = self.book.probe(board)
+            if entry is not None and entry[0] in moves:
+                move, score, depth = entry
+                self.pv = [move]
+                self.last_score, self.last_depth = score, depth
+                self.lines = [(score, move, [move])]
+                self.stats.book = True
+                self._report()
+                return move
+
+        start = time.time()
+        self._aborted = False
+
         # --- always do a depth‑1 scan first (no time limit) ---
         best_move = max(moves, key=lambda m: score_move(self, board, m))
         best_score = score_move(self, board, best_move)
-        self.node_counter = 0  # reset for this call
+        self.transposition.new_search()
+        for history in self._history:  # age the history so new cutoffs dominate
+            history[:] = [h >> 1 for h in history]
 
-        start = time.time()
         depth = 2  # we already did depth‑1 synchronously
+        self.pv = [best_move]
+        self.last_score, self.last_depth = None, 1
 
-        # iterative deepening within the allotted time
-        while True:
-            if time.time() - start >= self.time_limit:
+        empties = 64 - (board.black | board.white).bit_count()
+        if empties <= self.endgame_empties and self._solve_fits(empties, start):
+            if self.multi_pv > 1:
+                solved = self._solve_endgame_lines(board, moves, start, stop_event)
+            else:
+                solved = self._solve_endgame(board, start, stop_event)
+            if solved is not None:
+                self._report()
+                return solved
+
+        # iterative deepening until a limit interrupts an iteration
+        last_depth = empties if self.max_depth is None else min(empties, self.max_depth)
+        while depth <= last_depth:
+            if self._limits_hit(stop_event):
                 break
 
-            def eval_move(m):
-                child = board.copy()
-                child.make_move(*m)
-                score, _ = self.negamax(child, depth - 1, -float('inf'), float('inf'), -1, multithreaded=True)
-                return -score, m
-
-            best_depth_score = -float('inf')
-            best_depth_move = None
-
-            # multithread only if more than one move and time permits
-            if len(moves) > 1 and self.time_limit - (time.time() - start) > 0.05:
-                with concurrent.futures.ThreadPoolExecutor() as ex:
-                    for score, m in ex.map(eval_move, moves):
-                        if score > best_depth_score:
-                            best_depth_score, best_depth_move = score, m
-                        # time guard inside loop
-                        if time.time() - start >= self.time_limit:
-                            break
-            else:  # single‑thread fall‑back
-                for m in moves:
-                    score, _ = self.negamax(board.copy(), depth - 1, -float('inf'), float('inf'), -1, multithreaded=False)
-                    score = -score
-                    if score > best_depth_score:
-                        best_depth_score, best_depth_move = score, m
-                    if time.time() - start >= self.time_limit:
-                        break
-
-            # if we completed the depth within time, adopt the new best
-            if time.time() - start < self.time_limit and best_depth_move is not None:
-                best_move, best_score = best_depth_move, best_depth_score
-                depth += 1
+            if self.multi_pv > 1:
+                lines = self._search_root_lines(board, moves, depth, stop_event)
+                result = None if lines is None else lines[0]
             else:
+                result = self._aspiration_search(board, moves, depth, stop_event)
+                lines = None if result is None else [result]
+            if result is None:  # interrupted: keep the last complete depth
                 break
+            best_score, best_move, self.pv = result
+            self.lines = lines
+            self.last_score, self.last_depth = best_score, depth
+            self.iterations.append((depth, best_score, self.node_counter, time.time() - start))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("depth %d score %s nodes %d %.3fs pv %s", depth, best_score,
+                             self.node_counter, time.time() - start, self.pv)
+            self._report()
+            # search the previous best lines first at the next depth
+            for _, move, _ in reversed(lines):
+                moves.remove(move)
+                moves.insert(0, move)
+            depth += 1
 
         return best_move
+
+    def _report(self):
+        if self.on_iteration is not None:
+            self.on_iteration(self.last_depth, self.last_score, list(self.pv))
+
+    def _solve_fits(self, empties, start):
+        """Whether an exact solve of `empties` is expected to finish in its
+        share of the time budget."""
+        if self._deadline is None:
+            return True
+        expected = SOLVE_SECONDS_10 * SOLVE_GROWTH ** (empties - 10)
+        return expected <= (self._deadline - start) * ENDGAME_SHARE
+
+    def _solve_endgame(self, board, start, stop_event):
+        """Exact solve, given ENDGAME_SHARE of the budget; scores the margin
+        at EXACT_SCALE per disc.
+
+        Returns the move, or None if the solver ran out of time and the
+        heuristic search should use what is left.
+        """
+        deadline = self._deadline
+        if deadline is not None:
+            deadline = start + (deadline - start) * ENDGAME_SHARE
+        max_nodes = self._max_nodes
+        result = self.endgame.solve(*board.bitboards(), deadline, stop_event, max_nodes)
+        if result is None or result[1] is None:
+            return None
+        score, sq = result
+        move = divmod(sq, 8)
+        self.pv = [move]
+        self.last_score = score * EXACT_SCALE
+        self.last_depth = 64 - (board.black | board.white).bit_count()
+        self.last_exact = True
+        self.lines = [(self.last_score, move, [move])]
+        return move
+
+    def _solve_endgame_lines(self, board, moves, start, stop_event):
+        """_solve_endgame for multi-PV: every root move is solved exactly."""
+        deadline = self._deadline
+        if deadline is not None:
+            deadline = start + (deadline - start) * ENDGAME_SHARE
+        lines = []
+        for move in moves:
+            child = board.copy()
+            child.make_move(*move)
+            result = self.endgame.solve(*child.bitboards(), deadline, stop_event,
+                                        self._max_nodes)
+            if result is None:
+                return None
+            score, reply = result
+            pv = [move] if reply is None else [move, divmod(reply, 8)]
+            lines.append((-score * EXACT_SCALE, move, pv))
+        lines.sort(key=lambda line: -line[0])
+        self.lines = lines[:self.multi_pv]
+        self.last_score, _, self.pv = self.lines[0]
+        self.last_depth = 64 - (board.black | board.white).bit_count()
+        self.last_exact = True
+        return self.lines[0][1]
+
+    def _aspiration_search(self, board, moves, depth, stop_event):
+        """Search a window around the previous iteration's score, widening
+        whichever side fails until the score lands inside it."""
+        if self.last_score is None:
+            alpha, beta = -float('inf'), float('inf')
+        else:
+            alpha = self.last_score - ASPIRATION_WINDOW
+            beta = self.last_score + ASPIRATION_WINDOW
+        while True:
+            if self.workers > 1 and len(moves) > 1:
+                result = self._search_root_parallel(board, moves, depth, alpha, beta, stop_event)
+            else:
+                result = self._search_root(board, moves, depth, alpha, beta, stop_event)
+            if result is None:
+                return None
+            score = result[0]
+            if score <= alpha:
+                alpha = -float('inf')
+            elif score >= beta:
+                beta = float('inf')
+            else:
+                return result
+
+    def _search_root(self, board, moves, depth, alpha, beta, stop_event):
+        """PVS over the root moves in this process; returns (score, move, pv)."""
+        best_depth_score = -float('inf')
+        best_depth_move = None
+        best_pv = []
+        root = board.copy()
+        for i, m in enumerate(moves):
+            undo = root.make_move(*m)
+            if i == 0:
+                score, _ = self.negamax(root, depth - 1, -beta, -alpha, -1,
+                                        False, stop_event, 1)
+                score = -score
+            else:
+                score, _ = self.negamax(root, depth - 1, -alpha - 1, -alpha, -1,
+                                        False, stop_event, 1)
+                score = -score
+                if alpha < score < beta and not self._aborted:
+                    score, _ = self.negamax(root, depth - 1, -beta, -score, -1,
+                                            False, stop_event, 1)
+                    score = -score
+            root.unmake_move(undo)
+            if self._aborted:
+                return None
+            if score > best_depth_score:
+                best_depth_score, best_depth_move = score, m
+                best_pv = [m] + self._pv[1][1:self._pv_len[1]]
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best_depth_score, best_depth_move, best_pv
+
+    def _search_root_lines(self, board, moves, depth, stop_event):
+        """Multi-PV root search; returns the best multi_pv (score, move, pv).
+
+        Each move after the first multi_pv is tried with a null window at
+        the score of the current last line and only searched in full if it
+        beats it.  Runs in this process even when workers > 1.
+        """
+        inf = float('inf')
+        lines = []
+        root = board.copy()
+        for m in moves:
+            undo = root.make_move(*m)
+            if len(lines) < self.multi_pv:
+                score, _ = self.negamax(root, depth - 1, -inf, inf, -1, False, stop_event, 1)
+                score = -score
+            else:
+                bound = lines[-1][0]
+                score, _ = self.negamax(root, depth - 1, -bound - 1, -bound, -1,
+                                        False, stop_event, 1)
+                score = -score
+                if score > bound and not self._aborted:
+                    score, _ = self.negamax(root, depth - 1, -inf, -bound, -1,
+                                            False, stop_event, 1)
+                    score = -score
+            root.unmake_move(undo)
+            if self._aborted:
+                return None
+            if len(lines) < self.multi_pv or score > lines[-1][0]:
+                lines.append((score, m, [m] + self._pv[1][1:self._pv_len[1]]))
+                lines.sort(key=lambda line: -line[0])
+                del lines[self.multi_pv:]
+        return lines
+
+    def _search_root_parallel(self, board, moves, depth, alpha, beta, stop_event):
+        """Split the root moves across the worker pool.
+
+        The first (best-ordered) move is searched alone to establish a score;
+        the remaining moves then run in parallel with a null window at that
+        score, so most of them only need to prove they are no better.  Moves
+        that fail high are re-searched with the full window.  Workers get the
+        same deadline; the parent only waits until then and bumps the shared
+        search counter if an iteration is cut short, which stops every task
+        still running for it.
+        """
+        pool = self._get_pool()
+        state = (board.black, board.white, board.current_player)
+        # the colour goes with every task: callers retarget self.color per search
+        limits = (self._deadline, None if self._max_nodes is None
+                  else max(self._max_nodes - self.node_counter, 0),
+                  self._pool_search.value, self.color)
+        first = pool.submit(_search_root_move, state, moves[0], depth, alpha, beta, limits)
+        futures = [first]
+        try:
+            result = self._wait(first, stop_event)
+            if result is None:
+                return None
+            best_depth_score, best_pv = result
+            best_depth_move = moves[0]
+            alpha = max(alpha, best_depth_score)
+            if alpha >= beta:
+                return best_depth_score, best_depth_move, best_pv
+
+            bound = alpha
+            futures = [pool.submit(_search_root_move, state, m, depth, bound, bound + 1, limits)
+                       for m in moves[1:]]
+            for m, future in zip(moves[1:], futures):
+                result = self._wait(future, stop_event)
+                if result is None:
+                    return None
+                score, pv = result
+                if score > bound:
+                    # failed high on the null window: get the real score
+                    research = pool.submit(_search_root_move, state, m, depth, alpha, beta, limits)
+                    futures.append(research)
+                    result = self._wait(research, stop_event)
+                    if result is None:
+                        return None
+                    score, pv = result
+                if score > best_depth_score:
+                    best_depth_score, best_depth_move, best_pv = score, m, pv
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+            return best_depth_score, best_depth_move, best_pv
+        finally:
+            if self._aborted:
+                self._pool_search.value += 1
+            for f in futures:
+                f.cancel()
+
+    def _wait(self, future, stop_event):
+        """(score, pv) of a worker search, or None once a limit is hit."""
+        while True:
+            timeout = 0.005 if self._deadline is None else \
+                min(max(self._deadline - time.time(), 0.0), 0.005)
+            try:
+                score, nodes, aborted, pv, counters = future.result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                if self._limits_hit(stop_event):
+                    self._aborted = True
+                    return None
+                continue
+            self.node_counter += nodes
+            self.stats.merge(counters)
+            if aborted:
+                self._aborted = True
+                return None
+            return score, pv
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool_search = multiprocessing.RawValue('L', 0)
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.color, self.strength, self.tt_size_mb, self.tt_policy,
+                          self._pool_search, self._shared_table(), self.symmetry_discs,
+                          self.timing, self.patterns),
+            )
+        return self._pool
+
+    def _shared_table(self):
+        """The table workers should attach to, or None for private tables."""
+        return self.transposition if isinstance(self.transposition, SharedTable) else None
+
+    def close(self):
+        """Stop pondering and shut down the worker pool, if one was started."""
+        self.stop_ponder()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+# ─── process-pool workers ─────────────────────────────────────────────
+# Each worker process keeps one Engine (and so one transposition table)
+# alive for the lifetime of the pool.
+_worker_engine = None
+_worker_root = None
+_worker_search = None
+
+
+class _SearchCancelled:
+    """Stop flag for a worker task: set once the parent moves past its search."""
+
+    def __init__(self, search):
+        self.search = search
+
+    def is_set(self):
+        return _worker_search.value != self.search
+
+
+def _init_worker(color, strength, tt_size_mb, tt_policy, search, table, symmetry_discs, timing,
+                 patterns):
+    global _worker_engine, _worker_search
+    _worker_engine = Engine(color, strength, tt_size_mb=tt_size_mb, tt_policy=tt_policy,
+                            transposition=table, symmetry_discs=symmetry_discs, timing=timing,
+                            patterns=patterns)
+    _worker_search = search
+
+
+def _search_root_move(state, move, depth, alpha, beta, limits):
+    """Search one root move in a worker; returns (score, nodes, aborted, pv, counters)."""
+    global _worker_root
+    engine = _worker_engine
+    if state != _worker_root:
+        _worker_root = state
+        engine.transposition.new_search()
+    board = Board.from_bitboards(*state)
+    board.make_move(*move)
+    engine.node_counter = 0
+    engine.stats = SearchStats(engine.timing)
+    engine._deadline, engine._max_nodes, search, engine.color = limits
+    engine._aborted = False
+    score, _ = engine.negamax(board, depth - 1, -beta, -alpha, -1,
+                              False, _SearchCancelled(search), 1)
+    pv = [move] + engine._pv[1][1:engine._pv_len[1]]
+    return -score, engine.node_counter, engine._aborted, pv, engine.stats.counters()
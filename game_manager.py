@@ -1,82 +1,156 @@
-import copy
-import threading
 import pygame
 from kiwisolver import strength
 
+from analysis import AnalysisService, MOVE, HINT, EVAL
 from board import Board
-from engine import Engine
-from config import WHITE, BLACK, WIDTH, MENU_WIDTH
+from book import OpeningBook
+from engine import Engine, SCORE_RANGE, evaluation_stamp
+from game_record import GameRecord, append_games
+from config import (WHITE, BLACK, WIDTH, MENU_WIDTH, BOOK_PATH, CACHE_PATH, CACHE_SIZE_MB,
+                    AI_MOVE_TIME, AI_STRENGTH, HINT_TIME, GAMES_PATH)
+from shared_table import SharedTable
+from time_control import TimeControl
+
+_analysis_cache = None
+
+
+def analysis_cache():
+    """The process-wide analysis cache; it outlives restarts of the game."""
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = SharedTable(CACHE_SIZE_MB, CACHE_PATH,
+                                      stamp=evaluation_stamp(AI_STRENGTH))
+    return _analysis_cache
+
 
 class GameManager:
     def __init__(self):
         self.board = Board()
-        self.ai = Engine(WHITE)
-        self.bar_ai = Engine(WHITE)
+        self.cache = analysis_cache()
+        # one engine for the AI, hints and the eval bar, run by one worker
+        self.ai = Engine(WHITE, AI_STRENGTH, book=OpeningBook.open_if_exists(BOOK_PATH),
+                         transposition=self.cache)
+        self.analysis = AnalysisService(self.ai, ponder=True)  # think on the player's time
+        self.ai_request = None
+        self.hint_request = None
+        self.eval_request = None
+        self.eval_bar_score = 0.0  # from White's side, -1 (Black winning) to 1
         self.selected_move = None
         self.hint_active = False
         self.game_over = False
         self.ai_thinking = False
         self.winner = None
-        self.history = []
+        self.record = GameRecord()  # every ply so far, for undo/redo and saving
+        self.saved_plies = None  # the last game saved, so a redo to the end is not saved twice
         self.move_button_rect = pygame.Rect(WIDTH - MENU_WIDTH + 50, 100, 150, 40)
         self.hint_button_rect = pygame.Rect(WIDTH - MENU_WIDTH + 50, 147, 150, 40)
         self.restart_button_rect = pygame.Rect(WIDTH - MENU_WIDTH + 50, 194, 150, 40)
-        self.ai_thread = None
-        self.eval_thread = None
-        self.eval_cancel = threading.Event()
-
 
     def start_ai(self):
         if self.board.current_player == WHITE and not self.ai_thinking:
-            self.stop_eval_thread()  # Force stop eval before AI
             self.ai_thinking = True
-            self.ai_thread = threading.Thread(target=self.run_ai)
-            self.ai_thread.start()
+            self.ai_request = self.analysis.submit(MOVE, self.board, TimeControl(move_time=AI_MOVE_TIME))
 
-    def stop_eval_thread(self):
-        print("yo stopping")
-        self.bar_ai.stop_eval()  # ❶ stop any old eval thread
-
-    def start_eval_thread(self):
-        print("yo stopping1")
-        self.stop_eval_thread()  # safety: be sure the old one is gone
-        self.bar_ai.evaluate_position_async(self.board)  # ❷ start fresh
+    def request_hint(self):
+        if not self.game_over and not self.ai_thinking:
+            self.hint_request = self.analysis.submit(HINT, self.board, TimeControl(move_time=HINT_TIME))
 
     # ――― player (black) move ―――
     def play_move(self, row, col):
         if self.board.make_move(row, col):
-            self.history.append(copy.deepcopy(self.board))
+            self.record.append((row, col))
             self.selected_move = None
-            self.start_eval_thread()  # ❸ restart bar-eval
 
             if not self.check_game_end():
                 self.start_ai()
-    def run_ai(self):
-        move = self.ai.get_best_move(self.board)
-        if move and self.board.current_player == WHITE:
-            self.board.make_move(*move)
-            self.history.append(copy.deepcopy(self.board))
-        self.ai_thinking = False
-        self.check_game_end()
-        if not self.game_over:  # ❹ restart bar-eval
-            print("nerd")
-            self.start_eval_thread()
+
+    def update(self):
+        """Called every frame: pick up finished searches and keep the eval
+        bar analysing the position on the board.  Never blocks."""
+        request = self.ai_request
+        if request is not None and request.done:
+            self.ai_request = None
+            self.ai_thinking = False
+            if request.move and request.matches(self.board):
+                self.board.make_move(*request.move)
+                self.record.append(request.move)
+            if not self.check_game_end():
+                self.start_ai()  # the player had to pass
+
+        request = self.hint_request
+        if request is not None and not request.matches(self.board):
+            self.analysis.cancel(HINT)
+            self.hint_request = None
+        elif request is not None and request.done:
+            self.hint_request = None
+            if request.move:
+                self.selected_move = request.move
+                self.hint_active = True
+                pygame.time.set_timer(pygame.USEREVENT, 1000)
+
+        if self.game_over:
+            if self.eval_request is not None:
+                self.analysis.cancel(EVAL)
+                self.eval_request = None
+            return
+        if self.eval_request is None or not self.eval_request.matches(self.board):
+            self.eval_request = self.analysis.submit(EVAL, self.board)
+        score = self.eval_request.score_for(WHITE)
+        if score is not None:
+            self.eval_bar_score = max(-1.0, min(score / SCORE_RANGE, 1.0))
 
     def check_game_end(self):
-        if not self.board.get_valid_moves():
-            self.board.current_player = WHITE if self.board.current_player == BLACK else BLACK
-            if not self.board.get_valid_moves():
-                self.game_over = True
-                b, w = self.board.count_pieces()
-                if b > w:
-                    self.winner = "Black Wins!"
-                elif w > b:
-                    self.winner = "White Wins!"
-                else:
-                    self.winner = "Draw"
-                return True
+        if self.board.game_over():
+            if GAMES_PATH and self.record.plies != self.saved_plies:
+                append_games(GAMES_PATH, [self.record])
+                self.saved_plies = bytes(self.record.plies)
+            self.game_over = True
+            b, w = self.board.count_pieces()
+            if b > w:
+                self.winner = "Black Wins!"
+            elif w > b:
+                self.winner = "White Wins!"
+            else:
+                self.winner = "Draw"
+            return True
+        if self.board.must_pass():
+            self.board.pass_turn()
+            self.record.append(None)
         return False
 
+    # ――― undo / redo (whole turns of the player) ―――
+    def undo(self):
+        """Take back moves until it is Black's turn again, one turn earlier."""
+        if not self.record.cursor:
+            return
+        while self.record.undo() and self.record.board().current_player != BLACK:
+            pass
+        self._jump()
+
+    def redo(self):
+        """Replay undone moves up to Black's next turn."""
+        if not self.record.redo():
+            return
+        while self.record.board().current_player != BLACK and self.record.redo():
+            pass
+        self._jump()
+        if not self.check_game_end():
+            self.start_ai()
+
+    def _jump(self):
+        """Show the record's position, dropping searches for the old one."""
+        self.analysis.cancel(MOVE)
+        self.analysis.cancel(HINT)
+        self.ai_request = self.hint_request = None
+        self.ai_thinking = False
+        self.board = self.record.board()
+        self.selected_move = None
+        self.hint_active = False
+        self.game_over = False
+        self.winner = None
+
     def restart(self):
-        self.stop_eval_thread()
+        self.analysis.close()
+        if self.ai.book is not None:
+            self.ai.book.close()  # __init__ opens it again
         self.__init__()
@@ -0,0 +1,304 @@
+"""Compact game records: one byte per ply, with passes.
+
+A record is its move list as bytes: the square index r * 8 + c of each
+move, or PASS where the side to move had none.  Every `snapshot_every`
+plies the position is kept as bitboards, so rebuilding any ply replays
+at most that many moves.  Undo and redo move a cursor over the list; a
+new move after an undo drops the moves that were undone.
+
+Many games fit in one file (little-endian):
+    header   8s magic, Q game count                          (16 bytes)
+    game     B plies, | 0x80 if a start position follows
+             [Q black, Q white, B 1 if White is to move]     (custom start only)
+             one byte per ply
+
+so a typical game costs 61 bytes on disk:
+
+    python game_record.py export games.bin games.txt   # one move list per line
+    python game_record.py import games.txt games.bin
+    python game_record.py stats games.bin
+"""
+import argparse
+import mmap
+import os
+import struct
+
+from board import Board, flips, legal_moves, parse_moves, square_name
+from config import BLACK, WHITE
+
+PASS = 64
+SNAPSHOT_EVERY = 16
+MAGIC = b'OTHGAMES'
+HEADER = struct.Struct('<8sQ')
+START = struct.Struct('<QQB')
+HAS_START = 0x80
+MAX_PLIES = 0x7F
+
+_INITIAL = (Board().black, Board().white, BLACK)
+
+
+def play(state, ply):
+    """The (black, white, player) after playing byte `ply` from `state`."""
+    black, white, player = state
+    if ply == PASS:
+        return black, white, WHITE if player == BLACK else BLACK
+    if player == BLACK:
+        f = flips(black, white, ply)
+        return black | f | (1 << ply), white ^ f, WHITE
+    f = flips(white, black, ply)
+    return black ^ f, white | f | (1 << ply), BLACK
+
+
+class GameRecord:
+    """The plies of one game, position snapshots and an undo/redo cursor."""
+
+    def __init__(self, plies=b'', start=None, snapshot_every: int | None = SNAPSHOT_EVERY):
+        self.plies = bytearray(plies)
+        # (black, white, player) before the first ply; None for the usual start
+        self.start = start
+        self.snapshot_every = snapshot_every
+        self.cursor = len(self.plies)  # plies in effect; less than len after undo
+        self._snapshots = [start or _INITIAL]  # position at ply k * snapshot_every
+        self._cursor_state = None  # position at the cursor, once needed
+
+    @classmethod
+    def from_moves(cls, moves, start=None, **options):
+        """A record of (row, col) moves, or a move string, with passes implied."""
+        if isinstance(moves, str):
+            moves = parse_moves(moves)
+        record = cls(start=start, **options)
+        for move in moves:
+            if record.must_pass():
+                record.append(None)
+            record.append(move)
+        return record
+
+    def __len__(self):
+        return len(self.plies)
+
+    def moves(self):
+        """(row, col) per ply, None for a pass."""
+        return [None if ply == PASS else divmod(ply, 8) for ply in self.plies]
+
+    def text(self):
+        """The move string, passes left implicit."""
+        return ''.join(square_name(divmod(ply, 8)) for ply in self.plies if ply != PASS)
+
+    def state(self, ply):
+        """(black, white, player) after the first `ply` plies."""
+        if not 0 <= ply <= len(self.plies):
+            raise IndexError(f"ply {ply} out of range 0-{len(self.plies)}")
+        every = self.snapshot_every
+        if not every:
+            index, state = 0, self._snapshots[0]
+        else:
+            k = min(ply // every, len(self._snapshots) - 1)
+            index, state = k * every, self._snapshots[k]
+        plies = self.plies
+        while index < ply:
+            state = play(state, plies[index])
+            index += 1
+            if every and index % every == 0 and index // every == len(self._snapshots):
+                self._snapshots.append(state)
+        return state
+
+    def board(self, ply=None):
+        """A Board of the position after `ply` plies (default: the cursor)."""
+        return Board.from_bitboards(*(self._current() if ply is None else self.state(ply)))
+
+    def positions(self):
+        """Yield ((black, white, player), ply byte) for every ply, in order."""
+        state = self._snapshots[0]
+        for ply in self.plies:
+            yield state, ply
+            state = play(state, ply)
+
+    def _current(self):
+        if self._cursor_state is None:
+            self._cursor_state = self.state(self.cursor)
+        return self._cursor_state
+
+    def must_pass(self):
+        """True if the side to move at the cursor has to pass."""
+        black, white, player = self._current()
+        own, opp = (black, white) if player == BLACK else (white, black)
+        return not legal_moves(own, opp) and legal_moves(opp, own) != 0
+
+    def append(self, move):
+        """Play (row, col), or None for a pass, at the cursor.
+
+        Playing the ply that was undone there is a redo, which keeps the
+        rest of the line.  Raises ValueError if the move is not legal.
+        """
+        state = self._current()
+        black, white, player = state
+        own, opp = (black, white) if player == BLACK else (white, black)
+        if move is None:
+            if legal_moves(own, opp):
+                raise ValueError("cannot pass with a move available")
+            ply = PASS
+        else:
+            r, c = move
+            ply = r * 8 + c
+            if not 0 <= r < 8 or not 0 <= c < 8 or not legal_moves(own, opp) >> ply & 1:
+                raise ValueError(f"illegal move: {square_name(move)}")
+        if self.cursor < len(self.plies):
+            if self.plies[self.cursor] == ply:
+                self.redo()
+                return
+            self.truncate(self.cursor)
+        self.plies.append(ply)
+        self.cursor += 1
+        self._cursor_state = state = play(state, ply)
+        every = self.snapshot_every
+        if every and self.cursor % every == 0 and self.cursor // every == len(self._snapshots):
+            self._snapshots.append(state)
+
+    def truncate(self, ply):
+        """Drop every ply from `ply` on."""
+        del self.plies[ply:]
+        if self.snapshot_every:
+            del self._snapshots[ply // self.snapshot_every + 1:]
+        if self.cursor > ply:
+            self.cursor = ply
+            self._cursor_state = None
+
+    def undo(self):
+        """Step the cursor back one ply; False at the start."""
+        if not self.cursor:
+            return False
+        self.cursor -= 1
+        self._cursor_state = None
+        return True
+
+    def redo(self):
+        """Step the cursor forward over an undone ply; False if there is none."""
+        if self.cursor == len(self.plies):
+            return False
+        self._cursor_state = play(self._current(), self.plies[self.cursor])
+        self.cursor += 1
+        return True
+
+    def to_bytes(self):
+        if len(self.plies) > MAX_PLIES:
+            raise ValueError(f"a record holds at most {MAX_PLIES} plies")
+        if self.start is None:
+            return bytes([len(self.plies)]) + self.plies
+        black, white, player = self.start
+        return (bytes([len(self.plies) | HAS_START]) + START.pack(black, white, player == WHITE)
+                + self.plies)
+
+    @classmethod
+    def from_bytes(cls, data, offset=0, **options):
+        """(record, offset after it) decoded from `data` at `offset`."""
+        head = data[offset]
+        offset += 1
+        start = None
+        if head & HAS_START:
+            black, white, white_to_move = START.unpack_from(data, offset)
+            start = (black, white, WHITE if white_to_move else BLACK)
+            offset += START.size
+        end = offset + (head & MAX_PLIES)
+        if end > len(data):
+            raise ValueError("truncated game record")
+        return cls(data[offset:end], start, **options), end
+
+
+# ─── files of many games ───
+
+def write_games(path, records):
+    """Write `records` to a new file; returns the number written.
+
+    The file is replaced only once every record is written; if `records`
+    raises, the partial file is removed and `path` is left as it was.
+    """
+    count = 0
+    tmp = path + '.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, 0))
+            for record in records:
+                f.write(record.to_bytes())
+                count += 1
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, count))
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return count
+
+
+def append_games(path, records):
+    """Add `records` to the end of a games file, creating it if needed."""
+    if not os.path.exists(path):
+        return write_games(path, records)
+    with open(path, 'r+b') as f:
+        magic, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a games file")
+        f.seek(0, os.SEEK_END)
+        added = 0
+        for record in records:
+            f.write(record.to_bytes())
+            added += 1
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, count + added))
+    return added
+
+
+def read_games(path, **options):
+    """Yield every GameRecord in a games file, reading through mmap."""
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            raise ValueError(f"{path} is not a games file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, count = HEADER.unpack_from(data, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a games file")
+            offset = HEADER.size
+            for _ in range(count):
+                record, offset = GameRecord.from_bytes(data, offset, **options)
+                yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert and inspect game record files")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('import', help="move lists, one game per line -> games file")
+    p.add_argument('source')
+    p.add_argument('out')
+    p = sub.add_parser('export', help="games file -> move lists, one game per line")
+    p.add_argument('source')
+    p.add_argument('out')
+    p = sub.add_parser('stats', help="count the games and plies in a games file")
+    p.add_argument('source')
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        def records(f):
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield GameRecord.from_moves(line.strip(), snapshot_every=None)
+                    except ValueError as e:
+                        parser.error(f"{args.source}:{number}: {e}")
+
+        with open(args.source) as f:
+            print(f"{args.out}: {write_games(args.out, records(f))} games")
+    elif args.command == 'export':
+        with open(args.out, 'w') as f:
+            for record in read_games(args.source, snapshot_every=None):
+                f.write(record.text() + '\n')
+    else:
+        games = plies = passes = 0
+        for record in read_games(args.source, snapshot_every=None):
+            games += 1
+            plies += len(record)
+            passes += record.plies.count(PASS)
+        print({'games': games, 'plies': plies, 'passes': passes,
+               'bytes': os.path.getsize(args.source)})
+
+
+if __name__ == '__main__':
+    main()
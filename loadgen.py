@@ -0,0 +1,108 @@
+"""Load generator for server.py: throughput and latency percentiles.
+
+    python loadgen.py --port 7070 --clients 32 --requests 2000 --op bestmove --time 0.05
+
+Each client keeps --pipeline requests outstanding on its own connection.
+Positions are random openings of --random-plies moves, drawn from a pool
+of --positions so that some requests repeat and exercise deduplication.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from board import square_name
+from match import random_opening
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def client(args, positions, rng, counts, latencies, errors):
+    reader, writer = await asyncio.open_connection(args.host, args.port, limit=1 << 16)
+    sent = {}
+    next_id = 0
+
+    async def send():
+        nonlocal next_id
+        request = {'id': next_id, 'op': args.op, 'moves': rng.choice(positions)}
+        if args.op == 'bestmove':
+            request['time'] = args.time
+        elif args.op == 'analyse':
+            request['depth'] = args.depth
+        if args.deadline_ms is not None:
+            request['deadline_ms'] = args.deadline_ms
+        sent[next_id] = time.perf_counter()
+        next_id += 1
+        counts['sent'] += 1
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+
+    for _ in range(args.pipeline):
+        if counts['sent'] < args.requests:
+            await send()
+    while sent:
+        line = await reader.readline()
+        if not line:
+            break
+        response = json.loads(line)
+        latencies.append(time.perf_counter() - sent.pop(response['id']))
+        if not response['ok']:
+            errors[response['error']] = errors.get(response['error'], 0) + 1
+        if counts['sent'] < args.requests:
+            await send()
+    writer.close()
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    positions = [''.join(square_name(m) for m in random_opening(rng, args.random_plies))
+                 for _ in range(args.positions)]
+    counts, latencies, errors = {'sent': 0}, [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args, positions, random.Random(args.seed + i),
+                                  counts, latencies, errors)
+                           for i in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    writer.write(b'{"op": "stats"}\n')
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+        'errors': errors,
+        'server': stats,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for the engine server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7070)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--pipeline', type=int, default=4, help="requests in flight per client")
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--op', choices=('bestmove', 'analyse', 'evaluate'), default='bestmove')
+    parser.add_argument('--time', type=float, default=0.05)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--deadline-ms', type=float)
+    parser.add_argument('--positions', type=int, default=200)
+    parser.add_argument('--random-plies', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
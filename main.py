@@ -4,6 +4,7 @@ import sys
 from kiwisolver import strength
 
 from config import *
+from display import WIN
 from game_manager import GameManager
 from ui import draw_ui
 import time
@@ -16,16 +17,13 @@ def main():
     clock = pygame.time.Clock()
     gm = GameManager()
     running = True
-    hint_engine = Engine(gm.board.current_player, strength=4, time_limit=1.5)
 
     while running:
         # 1. handle passes
-        if not gm.board.get_valid_moves():
-            gm.board.current_player = WHITE if gm.board.current_player == BLACK else BLACK
-            if gm.board.current_player == WHITE:
-                gm.start_ai()  # ✅ use start_ai(), *not* run_ai()
-            if not gm.board.get_valid_moves():
-                gm.game_over = True
+        if not gm.game_over and not gm.board.get_valid_moves():
+            if not gm.check_game_end():
+                gm.start_ai()  # only starts if the pass handed White the move
+        gm.update()
         draw_ui(WIN, gm)
         clock.tick(60)
 
@@ -36,6 +34,11 @@ def main():
                 pygame.time.set_timer(pygame.USEREVENT, 0)
             if event.type == pygame.QUIT:
                 running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT:
+                    gm.undo()
+                elif event.key == pygame.K_RIGHT:
+                    gm.redo()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 x, y = pygame.mouse.get_pos()
                 if x < BOARD_WIDTH + 40:
@@ -46,17 +49,13 @@ def main():
                 elif gm.move_button_rect.collidepoint(x, y):
                     if gm.selected_move:
                         gm.play_move(*gm.selected_move)
-                        gm.ai.evaluating = False
                 elif gm.hint_button_rect.collidepoint(x, y):
-                    hint = hint_engine.get_best_move(gm.board)
-
-                    if hint:
-                        gm.selected_move = hint
-                        gm.hint_active = True
-                        pygame.time.set_timer(pygame.USEREVENT, 1000)
+                    gm.request_hint()
                 elif gm.restart_button_rect.collidepoint(x, y):
                     gm.restart()
 
+    gm.analysis.close()
+    gm.cache.snapshot()
     pygame.quit()
     sys.exit()
 
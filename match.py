@@ -0,0 +1,218 @@
+"""Headless engine-vs-engine matches.
+
+Plays many games between two Engine configurations across a process pool,
+streams one JSON line per finished game and prints an Elo / SPRT summary.
+
+    python match.py --a strength=4,time_limit=0.1 --b strength=3,time_limit=0.1 \\
+        --games 400 --workers 8 --random-plies 6 --out results.jsonl
+
+Each opening is played twice with colours swapped.  Openings come from
+--openings (one move list per line, e.g. "f5d6c3") or are generated with
+--random-plies random moves from the start position.
+"""
+import argparse
+import concurrent.futures
+import json
+import math
+import random
+import sys
+import time
+
+from board import Board, parse_moves, square_name
+from config import BLACK, WHITE
+from engine import Engine
+from time_control import TimeControl
+
+ENGINE_OPTIONS = {
+    'strength': int, 'time_limit': float, 'max_depth': int, 'max_nodes': int,
+    'game_time': float, 'increment': float, 'endgame_empties': int,
+    'eval_order_plies': int, 'tt_size_mb': float, 'symmetry_discs': int,
+}
+
+
+def parse_spec(text):
+    """'strength=4,time_limit=0.1' -> {'strength': 4, 'time_limit': 0.1}"""
+    spec = {}
+    for item in filter(None, text.split(',')):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in ENGINE_OPTIONS:
+            raise ValueError(f"unknown engine option: {name!r}")
+        spec[name] = ENGINE_OPTIONS[name](value)
+    return spec
+
+
+def make_engine(color, spec):
+    spec = dict(spec)
+    time_limit = spec.pop('time_limit', 0.5)
+    max_nodes = spec.pop('max_nodes', None)
+    game_time = spec.pop('game_time', None)
+    increment = spec.pop('increment', 0.0)
+    time_control = TimeControl(move_time=None if game_time is not None else time_limit,
+                               game_time=game_time, increment=increment, max_nodes=max_nodes)
+    return Engine(color, time_limit=time_limit, time_control=time_control, **spec)
+
+
+def random_opening(rng, plies):
+    board = Board()
+    moves = []
+    for _ in range(plies):
+        legal = board.get_valid_moves()
+        if not legal:
+            break
+        move = rng.choice(legal)
+        board.make_move(*move)
+        moves.append(move)
+    return moves
+
+
+def play_game(spec_a, spec_b, opening, a_is_black):
+    """Play one game; the result is from engine A's point of view."""
+    board = Board()
+    for move in opening:
+        if board.must_pass():
+            board.pass_turn()
+        board.make_move(*move)
+    a_color, b_color = (BLACK, WHITE) if a_is_black else (WHITE, BLACK)
+    engines = {a_color: make_engine(a_color, spec_a), b_color: make_engine(b_color, spec_b)}
+    spent = {BLACK: 0.0, WHITE: 0.0}
+    nodes = {BLACK: 0, WHITE: 0}
+    moves = list(opening)
+
+    while not board.game_over():
+        if board.must_pass():
+            board.pass_turn()
+            continue
+        engine = engines[board.current_player]
+        start = time.time()
+        move = engine.get_best_move(board)
+        spent[board.current_player] += time.time() - start
+        nodes[board.current_player] += engine.node_counter
+        board.make_move(*move)
+        moves.append(move)
+
+    black, white = board.count_pieces()
+    diff = black - white if a_is_black else white - black
+    return {
+        'opening': ''.join(square_name(m) for m in opening),
+        'a_color': 'black' if a_is_black else 'white',
+        'result': 1.0 if diff > 0 else 0.0 if diff < 0 else 0.5,
+        'black_discs': black,
+        'white_discs': white,
+        'moves': ''.join(square_name(m) for m in moves),
+        'time_a': round(spent[a_color], 3),
+        'time_b': round(spent[b_color], 3),
+        'nodes_a': nodes[a_color],
+        'nodes_b': nodes[b_color],
+    }
+
+
+def elo_summary(wins, draws, losses):
+    """Elo difference of A over B with a 95% confidence margin."""
+    n = wins + draws + losses
+    if not n:
+        return None
+    score = (wins + draws / 2) / n
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2
+                + losses * score ** 2) / n
+    margin = 1.96 * math.sqrt(variance / n)
+
+    def to_elo(s):
+        s = min(max(s, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / s - 1)
+
+    return {'score': score, 'elo': to_elo(score),
+            'elo_low': to_elo(score - margin), 'elo_high': to_elo(score + margin)}
+
+
+def sprt(wins, draws, losses, elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05):
+    """Log-likelihood ratio of H1 (elo1) against H0 (elo0), normal approximation."""
+    n = wins + draws + losses
+    lower, upper = math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+    if not wins or not losses:
+        return {'llr': 0.0, 'lower': lower, 'upper': upper, 'decision': None}
+    score = (wins + draws / 2) / n
+    variance = (wins + draws / 4) / n - score ** 2
+    s0 = 1 / (1 + 10 ** (-elo0 / 400))
+    s1 = 1 / (1 + 10 ** (-elo1 / 400))
+    llr = (s1 - s0) * (2 * score - s0 - s1) / (2 * variance / n) if variance > 0 else 0.0
+    decision = 'H1' if llr >= upper else 'H0' if llr <= lower else None
+    return {'llr': llr, 'lower': lower, 'upper': upper, 'decision': decision}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless engine-vs-engine match runner")
+    parser.add_argument('--a', default='', help="engine A options, e.g. strength=4,time_limit=0.1")
+    parser.add_argument('--b', default='', help="engine B options")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--openings', help="file with one opening move list per line")
+    parser.add_argument('--random-plies', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="JSONL file for per-game results (default: stdout)")
+    parser.add_argument('--sprt', nargs=2, type=float, metavar=('ELO0', 'ELO1'),
+                        help="stop early once the SPRT accepts either hypothesis")
+    args = parser.parse_args(argv)
+
+    spec_a, spec_b = parse_spec(args.a), parse_spec(args.b)
+    rng = random.Random(args.seed)
+    if args.openings:
+        openings = []
+        with open(args.openings) as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip() or line.startswith('#'):
+                    continue
+                where = f"{args.openings}:{number}"
+                try:
+                    opening = parse_moves(line)
+                except ValueError as e:
+                    parser.error(f"{where}: {e}")
+                board = Board()
+                for move in opening:
+                    if board.must_pass():
+                        board.pass_turn()
+                    if not board.make_move(*move):
+                        parser.error(f"{where}: illegal move {square_name(move)} in {line.strip()}")
+                openings.append(opening)
+    else:
+        openings = None
+
+    out = open(args.out, 'a') if args.out else sys.stdout
+    wins = draws = losses = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {}
+        for i in range(args.games):
+            pair = i // 2
+            if openings:
+                opening = openings[pair % len(openings)]
+            elif i % 2 == 0:
+                opening = random_opening(rng, args.random_plies)
+            futures[pool.submit(play_game, spec_a, spec_b, opening, i % 2 == 0)] = i
+
+        for future in concurrent.futures.as_completed(futures):
+            record = future.result()
+            record['game'] = futures[future]
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            if record['result'] == 1.0:
+                wins += 1
+            elif record['result'] == 0.0:
+                losses += 1
+            else:
+                draws += 1
+            if args.sprt and sprt(wins, draws, losses, *args.sprt)['decision']:
+                for f in futures:
+                    f.cancel()
+                break
+
+    summary = {'games': wins + draws + losses, 'wins': wins, 'draws': draws, 'losses': losses,
+               'elo': elo_summary(wins, draws, losses)}
+    if args.sprt:
+        summary['sprt'] = sprt(wins, draws, losses, *args.sprt)
+    print(json.dumps({'summary': summary}), file=sys.stderr)
+    if args.out:
+        out.close()
+
+
+if __name__ == '__main__':
+    main()
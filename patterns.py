@@ -0,0 +1,317 @@
+"""Pattern evaluation: fitted weights for the contents of fixed groups of squares.
+
+Each pattern (an edge with its two X-squares, a 3x3 or 2x5 corner block,
+a diagonal) is read as a base-3 number, one digit per square: 0 empty,
+1 the side to move, 2 the opponent.  The evaluation is the sum, over every
+orientation of every pattern, of the weight of that number in the table
+for the game phase, plus a per-phase bias.  It is scored from the side to
+move, in 1/SCALE of a disc of final margin.
+
+All 34 pattern codes are built at once: per-row tables give each byte's
+contribution to every code, packed into one integer as 32-bit fields, so
+a position costs sixteen additions and one table lookup per code.
+
+Weights are fitted by least squares against self-play results
+(see selfplay.py) and stored in a compact file loaded at startup:
+
+    python patterns.py fit selfplay/ --epochs 20 --out patterns.bin
+    python patterns.py test patterns.bin held_out/
+
+File layout (little-endian):
+    header   8s magic, H phases, H scale, I features, I pattern checksum
+    body     zlib-compressed int16 weights, phase-major
+"""
+import argparse
+import functools
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from symmetry import SQUARE_MAP
+
+MAGIC = b'OTHPATT1'
+HEADER = struct.Struct('<8sHHII')
+SCALE = 16  # weight units per disc
+N_PHASES = 16
+
+
+def _squares(*cells):
+    return tuple(r * 8 + c for r, c in cells)
+
+
+# base orientation of each pattern, in digit order
+FAMILIES = (
+    ('edge+2x', _squares(*((0, c) for c in range(8)), (1, 1), (1, 6))),
+    ('corner3x3', _squares(*((r, c) for r in range(3) for c in range(3)))),
+    ('corner2x5', _squares(*((r, c) for r in range(2) for c in range(5)))),
+    ('diag8', _squares(*((i, i) for i in range(8)))),
+    ('diag7', _squares(*((i, i + 1) for i in range(7)))),
+    ('diag6', _squares(*((i, i + 2) for i in range(6)))),
+    ('diag5', _squares(*((i, i + 3) for i in range(5)))),
+    ('diag4', _squares(*((i, i + 4) for i in range(4)))),
+)
+
+
+def _orientations(base):
+    """The distinct placements of a pattern under the eight symmetries."""
+    out, seen = [], set()
+    for t in range(8):
+        squares = tuple(SQUARE_MAP[t][sq] for sq in base)
+        if frozenset(squares) not in seen:
+            seen.add(frozenset(squares))
+            out.append(squares)
+    return out
+
+
+# (family, squares) for every placement, and where each family's table starts
+INSTANCES = tuple((f, squares) for f, (_, base) in enumerate(FAMILIES)
+                  for squares in _orientations(base))
+OFFSETS = []
+_total = 0
+for _, _base in FAMILIES:
+    OFFSETS.append(_total)
+    _total += 3 ** len(_base)
+OFFSETS = tuple(OFFSETS)
+BIAS = _total  # the last feature is always on
+FEATURES = _total + 1
+ACTIVE = len(INSTANCES) + 1  # features on in every position
+
+# files fitted for other pattern definitions are refused
+CHECKSUM = zlib.crc32(repr((FAMILIES, N_PHASES)).encode())
+
+# phase by number of discs on the board
+PHASE = tuple(min(max(discs - 4, 0) * N_PHASES // 61, N_PHASES - 1) for discs in range(65))
+
+
+def _packed_rows(digit):
+    """[row][byte] -> what the set bits add to every code, as 32-bit fields."""
+    per_square = [0] * 64
+    for i, (_, squares) in enumerate(INSTANCES):
+        for j, sq in enumerate(squares):
+            per_square[sq] += digit * 3 ** j << (32 * i)
+    rows = []
+    for r in range(8):
+        row = [0] * 256
+        for value in range(1, 256):
+            low = value & -value
+            row[value] = row[value ^ low] + per_square[r * 8 + low.bit_length() - 1]
+        rows.append(tuple(row))
+    return tuple(rows)
+
+
+_OWN_ROWS = _packed_rows(1)
+_OPP_ROWS = _packed_rows(2)
+_START = sum(OFFSETS[f] << (32 * i) for i, (f, _) in enumerate(INSTANCES)) \
+    + (BIAS << (32 * len(INSTANCES)))
+_CODE_BYTES = 4 * ACTIVE
+
+
+class PatternWeights:
+    """One int16 weight table per phase."""
+
+    def __init__(self, tables):
+        if len(tables) != N_PHASES or any(len(t) != FEATURES for t in tables):
+            raise ValueError("wrong number of pattern weights")
+        self.tables = tuple(array('h', t) for t in tables)
+
+    def evaluate(self, own, opp):
+        """Predicted final margin for the side to move (`own`), in 1/SCALE discs."""
+        discs = (own | opp).bit_count()
+        if discs == 64:
+            return (own.bit_count() - 32) * 2 * SCALE
+        x = _START
+        for row, byte in zip(_OWN_ROWS, own.to_bytes(8, 'little')):
+            x += row[byte]
+        for row, byte in zip(_OPP_ROWS, opp.to_bytes(8, 'little')):
+            x += row[byte]
+        table = self.tables[PHASE[discs]]
+        codes = memoryview(x.to_bytes(_CODE_BYTES, sys.byteorder)).cast('I')
+        return sum(map(table.__getitem__, codes))
+
+    def evaluate_batch(self, own, opp):
+        """evaluate() over uint64 arrays of bitboards (requires NumPy)."""
+        import numpy as np
+        weights = np.stack([np.frombuffer(t, dtype=np.int16) for t in self.tables])
+        own = np.asarray(own, dtype=np.uint64)
+        opp = np.asarray(opp, dtype=np.uint64)
+        cells = _cells(own).astype(np.int64) - _cells(opp)
+        phase = np.array(PHASE, dtype=np.int64)[np.abs(cells).sum(axis=1)]
+        score = weights[phase[:, None], features_batch(own, opp)].sum(axis=1)
+        full = (own | opp) == np.uint64(0xFFFF_FFFF_FFFF_FFFF)
+        return np.where(full, cells.sum(axis=1) * SCALE, score)
+
+    def save(self, path):
+        body = b''.join(t.tobytes() if sys.byteorder == 'little' else _swapped(t)
+                        for t in self.tables)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, N_PHASES, SCALE, FEATURES, CHECKSUM))
+            f.write(zlib.compress(body, 9))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, phases, scale, features, checksum = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a pattern weight file")
+        if (phases, scale, features, checksum) != (N_PHASES, SCALE, FEATURES, CHECKSUM):
+            raise ValueError(f"{path} was fitted for different patterns")
+        weights = array('h', zlib.decompress(data[HEADER.size:]))
+        if sys.byteorder != 'little':
+            weights.byteswap()
+        return cls([weights[p * FEATURES:(p + 1) * FEATURES] for p in range(N_PHASES)])
+
+
+def _swapped(table):
+    table = array('h', table)
+    table.byteswap()
+    return table.tobytes()
+
+
+@functools.lru_cache(maxsize=None)
+def load(path):
+    """PatternWeights.load, shared by every engine in the process."""
+    return PatternWeights.load(path)
+
+
+# ─── NumPy versions, for fitting and batch scoring ───
+
+def features_batch(own, opp):
+    """(N, ACTIVE) feature indices of uint64 arrays of bitboards."""
+    import numpy as np
+    cells = _cells(own).astype(np.int32) + 2 * _cells(opp)
+    out = np.empty((len(cells), ACTIVE), dtype=np.int64)
+    for i, (f, squares) in enumerate(INSTANCES):
+        powers = 3 ** np.arange(len(squares), dtype=np.int32)
+        out[:, i] = OFFSETS[f] + cells[:, squares] @ powers
+    out[:, -1] = BIAS
+    return out
+
+
+def phase_batch(own, opp):
+    import numpy as np
+    discs = _cells(own | opp).sum(axis=1)
+    return np.array(PHASE, dtype=np.int64)[discs]
+
+
+def _cells(bitboards):
+    import numpy as np
+    raw = np.ascontiguousarray(bitboards, dtype='<u8').view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(raw, axis=1, bitorder='little')
+
+
+def tied_features():
+    """feature -> the feature sharing its weight.
+
+    A pattern that maps onto itself under a symmetry (an edge read
+    backwards, a corner block transposed) gives the same code in a
+    different order; tying those codes keeps the evaluation symmetric.
+    """
+    import numpy as np
+    tie = np.arange(FEATURES)
+    for f, (_, base) in enumerate(FAMILIES):
+        n = len(base)
+        codes = np.arange(3 ** n)
+        digits = codes[:, None] // 3 ** np.arange(n) % 3
+        canonical = codes.copy()
+        for t in range(8):
+            mapped = [SQUARE_MAP[t][sq] for sq in base]
+            if set(mapped) != set(base):
+                continue
+            # digit j of the image is the digit of the square mapped onto base[j]
+            order = [mapped.index(sq) for sq in base]
+            canonical = np.minimum(canonical, digits[:, order] @ 3 ** np.arange(n))
+        tie[OFFSETS[f]:OFFSETS[f] + 3 ** n] = OFFSETS[f] + canonical
+    return tie
+
+
+def _records(batch):
+    """(own, opp, phase, target) arrays of a batch of self-play records."""
+    import numpy as np
+    from selfplay import WHITE_TO_MOVE
+    white = (batch['flags'] & WHITE_TO_MOVE).astype(bool)
+    own = np.where(white, batch['white'], batch['black'])
+    opp = np.where(white, batch['black'], batch['white'])
+    target = batch['result'].astype(np.float64) * SCALE
+    return own, opp, phase_batch(own, opp), target
+
+
+def fit(directory, epochs=20, rate=1.0, l2=50.0, batch_size=1 << 16, log=print):
+    """Least-squares fit of the weights to the results in a self-play directory.
+
+    Mini-batch gradient descent, each weight's step divided by how often
+    its feature occurs so that rare and common codes converge together.
+    `l2` pulls weights seen in few positions towards zero: most codes turn
+    up in only a handful of games, whose results they would otherwise learn.
+    """
+    import numpy as np
+    from selfplay import iter_records
+    tie = tied_features()
+    weights = np.zeros(N_PHASES * FEATURES)
+    for epoch in range(epochs):
+        sq_error = count = 0
+        for batch in iter_records(directory, batch_size):
+            own, opp, phase, target = _records(batch)
+            index = phase[:, None] * FEATURES + tie[features_batch(own, opp)]
+            error = target - weights[index].sum(axis=1)
+            sq_error += float(error @ error)
+            count += len(error)
+            grad = np.bincount(index.ravel(), np.repeat(error, ACTIVE), weights.size)
+            hits = np.bincount(index.ravel(), minlength=weights.size)
+            weights += rate * (grad - l2 * weights * (hits > 0)) / (ACTIVE * hits + l2)
+        if count:
+            log(f"epoch {epoch + 1}: rms error {np.sqrt(sq_error / count) / SCALE:.2f} discs")
+    weights = weights.reshape(N_PHASES, FEATURES)[:, tie]
+    weights = np.clip(np.rint(weights), -32768, 32767).astype('<i2')
+    return PatternWeights([array('h', row.tobytes()) for row in weights])
+
+
+def test(weights, directory):
+    """(rms error, mean absolute error) in discs over a self-play directory."""
+    import numpy as np
+    from selfplay import iter_records
+    sq_error = abs_error = count = 0
+    for batch in iter_records(directory):
+        own, opp, _, target = _records(batch)
+        error = target - weights.evaluate_batch(own, opp)
+        sq_error += float(error @ error)
+        abs_error += float(np.abs(error).sum())
+        count += len(error)
+    if not count:
+        return 0.0, 0.0
+    return np.sqrt(sq_error / count) / SCALE, abs_error / count / SCALE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit and check pattern evaluation weights")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('fit', help="fit weights to self-play results")
+    p.add_argument('data', help="directory written by selfplay.py")
+    p.add_argument('--out', default='patterns.bin')
+    p.add_argument('--epochs', type=int, default=20)
+    p.add_argument('--rate', type=float, default=1.0)
+    p.add_argument('--l2', type=float, default=50.0, help="regularisation strength")
+    p.add_argument('--validate', metavar='DIR', help="report the error on held-out data")
+    p = sub.add_parser('test', help="error of a weight file on self-play results")
+    p.add_argument('weights')
+    p.add_argument('data')
+    args = parser.parse_args(argv)
+
+    if args.command == 'fit':
+        weights = fit(args.data, args.epochs, args.rate, args.l2)
+        weights.save(args.out)
+        print(f"{args.out}: {os.path.getsize(args.out)} bytes")
+        if args.validate:
+            rms, mean = test(weights, args.validate)
+            print(f"held out: rms {rms:.2f}, mean {mean:.2f} discs")
+    else:
+        rms, mean = test(PatternWeights.load(args.weights), args.data)
+        print(f"rms {rms:.2f}, mean {mean:.2f} discs")
+
+
+if __name__ == '__main__':
+    main()
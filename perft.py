@@ -0,0 +1,61 @@
+"""Move-generator validation: perft counts, divide and throughput.
+
+    python perft.py 8                     # start position, checked against PERFT_START
+    python perft.py 6 --moves f5d6 --divide
+    python perft.py 9 --workers 8
+    python perft.py 6 --check             # also verify make/unmake and hashing per node
+
+Exits with status 1 if a count from the start position does not match the
+reference, or if --check finds an inconsistency.
+"""
+import argparse
+import sys
+import time
+
+from board import Board, PERFT_START, parse_moves, square_name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count positions N plies ahead")
+    parser.add_argument('depth', type=int)
+    parser.add_argument('--moves', default='', help="play these moves first, e.g. f5d6c3")
+    parser.add_argument('--divide', action='store_true', help="one count per root move")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--check', action='store_true',
+                        help="verify valid_move, unmake_move and the Zobrist key at every node")
+    args = parser.parse_args(argv)
+
+    board = Board()
+    for move in parse_moves(args.moves):
+        if board.must_pass():
+            board.pass_turn()
+        if not board.make_move(*move):
+            parser.error(f"illegal move: {square_name(move)}")
+
+    start = time.perf_counter()
+    try:
+        result = board.perft(args.depth, args.divide, args.workers, args.check)
+    except AssertionError as e:
+        print(f"check failed: {e}")
+        return 1
+    seconds = time.perf_counter() - start
+
+    if args.divide:
+        for move, count in sorted(result.items(), key=lambda item: item[0] or (-1, -1)):
+            print(f"{'pass' if move is None else square_name(move)}: {count}")
+        total = sum(result.values())
+    else:
+        total = result
+    print(f"perft({args.depth}) = {total}  {seconds:.3f}s  {total / seconds if seconds else 0:,.0f} leaves/s")
+
+    if not args.moves and args.depth < len(PERFT_START):
+        expected = PERFT_START[args.depth]
+        if total != expected:
+            print(f"MISMATCH: expected {expected}")
+            return 1
+        print("matches the reference count")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""Batch analysis: the best moves of many positions, or of every ply of a game.
+
+    python review.py game f5d6c3d3c4f4c5b3c2 --depth 8 --multi-pv 3 --workers 4
+    python review.py positions lines.txt --time 0.5 --workers 8
+
+Positions are split into runs of consecutive entries, one run per task.
+A worker searches its run from the last position backwards on one engine,
+so every search finds the deeper results of the position after it already
+in the transposition table.  Results stream back as each position
+finishes, in completion order, as dicts:
+
+    index    position's place in the input
+    move     best move, score and depth, for the side to move
+    exact    True if the score is a solved margin (engine.EXACT_SCALE per disc)
+    lines    [(score, move, pv)] of the best --multi-pv moves, best first
+    nodes, seconds
+
+analyse_game() also adds `played`, the move made from the position.
+"""
+import argparse
+import concurrent.futures
+import math
+import multiprocessing
+import queue
+import time
+
+from board import Board, parse_moves, square_name
+from config import BLACK
+from engine import Engine
+from time_control import TimeControl
+
+_engine = None
+_results = None
+_stop = None
+
+
+def _make_engine(strength, tt_size_mb, multi_pv, endgame_empties):
+    return Engine(BLACK, strength, tt_size_mb=tt_size_mb, multi_pv=multi_pv,
+                  endgame_empties=endgame_empties)
+
+
+def _init_worker(options, results, stop):
+    global _engine, _results, _stop
+    _engine = _make_engine(*options)
+    _results = results
+    _stop = stop
+
+
+def _analyse_run(engine, run, depth, move_time, stop):
+    """Search (index, state) entries from the last backwards; yields results."""
+    for index, state in reversed(run):
+        if stop is not None and stop.is_set():
+            return
+        board = Board.from_bitboards(*state)
+        engine.color = board.current_player  # scores for the side to move
+        engine.time_control = TimeControl(move_time=move_time)
+        engine.max_depth = depth
+        start = time.perf_counter()
+        move = engine.get_best_move(board, stop)
+        yield {
+            'index': index,
+            'move': move,
+            'score': engine.last_score,
+            'depth': engine.last_depth,
+            'exact': engine.last_exact,
+            'lines': list(engine.lines),
+            'nodes': engine.node_counter,
+            'seconds': time.perf_counter() - start,
+        }
+
+
+def _run_task(run, depth, move_time):
+    for result in _analyse_run(_engine, run, depth, move_time, _stop):
+        _results.put(result)
+
+
+def analyse_positions(positions, depth=None, move_time=None, multi_pv=1, workers=1,
+                      run_length=None, strength=4, tt_size_mb=64, endgame_empties=12):
+    """Yield one result per position, in the order they finish.
+
+    `positions` are Boards, in an order where neighbours are related (the
+    plies of a game) if the transposition table is to help.  Each search is
+    limited by `depth`, `move_time` seconds or both.  Runs are `run_length`
+    positions long, by default an equal share for each worker.
+    """
+    if depth is None and move_time is None:
+        raise ValueError("give a depth or a move time")
+    entries = [(i, (b.black, b.white, b.current_player)) for i, b in enumerate(positions)]
+    if not entries:
+        return
+    workers = max(1, workers)
+    if run_length is None:
+        run_length = math.ceil(len(entries) / workers)
+    runs = [entries[i:i + run_length] for i in range(0, len(entries), run_length)]
+    options = (strength, tt_size_mb, multi_pv, endgame_empties)
+
+    if workers == 1:
+        engine = _make_engine(*options)
+        for run in runs:
+            yield from _analyse_run(engine, run, depth, move_time, None)
+        return
+
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(workers, len(runs)), initializer=_init_worker,
+        initargs=(options, results, stop))
+    try:
+        futures = [pool.submit(_run_task, run, depth, move_time) for run in runs]
+        for _ in entries:
+            while True:
+                try:
+                    result = results.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    for future in futures:
+                        if future.done() and future.exception() is not None:
+                            raise future.exception()
+            yield result
+    finally:
+        stop.set()  # the caller may stop early; running searches return at once
+        pool.shutdown(cancel_futures=True)
+
+
+def game_positions(moves):
+    """The position before each move of a game; passes are implied."""
+    board = Board()
+    positions = []
+    for move in moves:
+        if board.must_pass():
+            board.pass_turn()
+        positions.append(board.copy())
+        if not board.make_move(*move):
+            raise ValueError(f"illegal move: {square_name(move)}")
+    return positions
+
+
+def analyse_game(moves, **options):
+    """analyse_positions over every move of a game, given as a move list.
+
+    Passes are implied; a None entry for one (GameRecord.moves()) is skipped.
+    """
+    moves = [move for move in moves if move is not None]
+    for result in analyse_positions(game_positions(moves), **options):
+        result['played'] = moves[result['index']]
+        yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse a game or a list of positions")
+    parser.add_argument('kind', choices=('game', 'positions'))
+    parser.add_argument('source', help="a move list (game) or a file of move lists (positions)")
+    parser.add_argument('--depth', type=int)
+    parser.add_argument('--time', type=float, help="seconds per position")
+    parser.add_argument('--multi-pv', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--strength', type=int, default=4)
+    parser.add_argument('--tt-size-mb', type=float, default=64)
+    args = parser.parse_args(argv)
+    if args.depth is None and args.time is None:
+        args.depth = 6
+
+    options = dict(depth=args.depth, move_time=args.time, multi_pv=args.multi_pv,
+                   workers=args.workers, strength=args.strength, tt_size_mb=args.tt_size_mb)
+    start = time.perf_counter()
+    if args.kind == 'game':
+        results = analyse_game(parse_moves(args.source), **options)
+    else:
+        with open(args.source) as f:
+            lines = [line.strip() for line in f if line.strip()]
+        positions = []
+        for line in lines:
+            board = Board()
+            for move in parse_moves(line):
+                if board.must_pass():
+                    board.pass_turn()
+                if not board.make_move(*move):
+                    parser.error(f"illegal move {square_name(move)} in {line}")
+            if board.must_pass():
+                board.pass_turn()
+            positions.append(board)
+        results = analyse_positions(positions, **options)
+
+    count = 0
+    for result in results:
+        count += 1
+        lines = '  '.join(f"{square_name(move)} {score}" for score, move, _ in result['lines'])
+        played = f"played {square_name(result['played'])}  " if 'played' in result else ''
+        print(f"{result['index']:3d}: {played}depth {result['depth']}  {lines}")
+    print(f"{count} positions in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
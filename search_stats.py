@@ -0,0 +1,159 @@
+"""Per-search statistics, and an opt-in sampling profiler for the search thread."""
+import collections
+import os
+import sys
+import threading
+
+CUTOFF_SLOTS = 16  # beta cutoffs by move index; the last slot counts the rest
+
+
+class SearchStats:
+    """Counters for one search, filled in by Engine.negamax.
+
+    Time spent in move generation, evaluation and hashing is only measured
+    with `timing`, since that costs two clock reads per section.
+    """
+
+    COUNTERS = ('tt_probes', 'tt_hits', 'tt_cutoffs', 'evals', 'cutoffs')
+
+    def __init__(self, timing: bool = False):
+        self.timing = timing
+        self.nodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.evals = 0
+        self.cutoffs = 0
+        self.cutoff_index = [0] * CUTOFF_SLOTS
+        self.movegen_time = 0.0
+        self.eval_time = 0.0
+        self.hash_time = 0.0
+        self.endgame_nodes = 0
+        self.book = False
+        self.seconds = 0.0
+        self.iterations: list[tuple[int, int, int, float]] = []
+        self.profile = None
+
+    def counters(self):
+        """The additive counters, to send back from a worker process."""
+        out = {name: getattr(self, name) for name in self.COUNTERS}
+        out['cutoff_index'] = self.cutoff_index
+        out['times'] = (self.movegen_time, self.eval_time, self.hash_time)
+        return out
+
+    def merge(self, counters):
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + counters[name])
+        for i, n in enumerate(counters['cutoff_index']):
+            self.cutoff_index[i] += n
+        movegen, evaluation, hashing = counters['times']
+        self.movegen_time += movegen
+        self.eval_time += evaluation
+        self.hash_time += hashing
+
+    def nodes_per_depth(self):
+        """{depth: nodes searched by that iteration}"""
+        out, previous = {}, 0
+        for depth, _, nodes, _ in self.iterations:
+            out[depth] = nodes - previous
+            previous = nodes
+        return out
+
+    def branching_factor(self):
+        """Effective branching factor: nodes of the last iteration over the one before."""
+        counts = list(self.nodes_per_depth().values())
+        if len(counts) < 2 or not counts[-2]:
+            return None
+        return counts[-1] / counts[-2]
+
+    def summary(self):
+        cutoffs = self.cutoffs
+        last = max((i for i, n in enumerate(self.cutoff_index) if n), default=-1)
+        out = {
+            'nodes': self.nodes,
+            'seconds': self.seconds,
+            'nps': self.nodes / self.seconds if self.seconds else 0.0,
+            'depth': self.iterations[-1][0] if self.iterations else None,
+            'nodes_per_depth': self.nodes_per_depth(),
+            'branching_factor': self.branching_factor(),
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': self.tt_hits / self.tt_probes if self.tt_probes else 0.0,
+            'tt_cutoffs': self.tt_cutoffs,
+            'evals': self.evals,
+            'cutoffs': cutoffs,
+            # share of cutoffs made by the first move tried: move-ordering quality
+            'first_move_cutoff_rate': self.cutoff_index[0] / cutoffs if cutoffs else 0.0,
+            'cutoff_index': self.cutoff_index[:last + 1],
+            'endgame_nodes': self.endgame_nodes,
+            'book': self.book,
+        }
+        if self.timing:
+            out['time'] = {'movegen': self.movegen_time, 'eval': self.eval_time,
+                           'hash': self.hash_time}
+        if self.profile is not None:
+            out['profile'] = self.profile
+        return out
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every `interval` seconds.
+
+    Counts, per function, how often it was running (self) and how often it
+    was anywhere on the stack (total).  Each sample holds the GIL briefly,
+    so the sampled thread slows down a little while the profiler runs.
+    """
+
+    def __init__(self, thread_id: int | None = None, interval: float = 0.001):
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = interval
+        self.samples = 0
+        self.self_counts = collections.Counter()
+        self.total_counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            name = _frame_name(frame)
+            self.self_counts[name] += 1
+            while frame is not None:
+                name = _frame_name(frame)
+                if name not in seen:
+                    seen.add(name)
+                    self.total_counts[name] += 1
+                frame = frame.f_back
+
+    def report(self, top: int = 20):
+        """The `top` functions by self samples, as fractions of all samples."""
+        n = self.samples or 1
+        return [{'function': name, 'self': count / n, 'total': self.total_counts[name] / n}
+                for name, count in self.self_counts.most_common(top)]
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
@@ -0,0 +1,185 @@
+"""Self-play training data: labelled positions in compact binary chunks.
+
+    python selfplay.py --games 20000 --workers 8 --depth 3 --out data/
+    python selfplay.py --summary data/
+
+Games start from --random-plies random moves and are then played by the
+engine searching to --depth (with an exact solve of the last
+--endgame-empties squares).  Every position the engine searched, that is
+each one after the random opening where the side to move has a move,
+becomes one record of RECORD_DTYPE:
+
+    black, white  uint64 bitboards
+    flags         bit 0: White to move; bit 1: score is an exact disc
+                  difference from the endgame solver
+    score         search score for the side to move
+    result        final disc difference for the side to move, empty
+                  squares going to the winner (as the endgame solver scores)
+
+Records are written to `out` in .npy chunks of --chunk-size as games
+finish; iter_records() streams them back one memory-mapped chunk at a time.
+"""
+import argparse
+import concurrent.futures
+import glob
+import os
+import random
+
+import numpy as np
+
+from board import Board
+from config import BLACK, WHITE
+from endgame import final_score
+from engine import EXACT_SCALE, Engine
+from time_control import TimeControl
+
+RECORD_DTYPE = np.dtype([
+    ('black', '<u8'),
+    ('white', '<u8'),
+    ('flags', 'u1'),
+    ('score', '<i2'),
+    ('result', 'i1'),
+])
+WHITE_TO_MOVE = 1
+EXACT_SCORE = 2
+
+_engine = None
+
+
+def _init_worker(depth, endgame_empties, tt_size_mb):
+    global _engine
+    _engine = Engine(BLACK, time_control=TimeControl(), max_depth=depth,
+                     endgame_empties=endgame_empties, tt_size_mb=tt_size_mb)
+
+
+def play_game(seed, random_plies):
+    """Play one self-play game in a worker; returns its records."""
+    rng = random.Random(seed)
+    engine = _engine
+    board = Board()
+    rows = []
+    ply = 0
+    while not board.game_over():
+        if board.must_pass():
+            board.pass_turn()
+            continue
+        if ply < random_plies:
+            move = rng.choice(board.get_valid_moves())
+        else:
+            engine.color = board.current_player  # search for the side to move
+            move = engine.get_best_move(board)
+            flags = WHITE_TO_MOVE if board.current_player == WHITE else 0
+            score = engine.last_score or 0
+            if engine.last_exact:
+                flags |= EXACT_SCORE
+                score //= EXACT_SCALE
+            score = max(-32768, min(int(score), 32767))
+            rows.append((board.black, board.white, flags, score))
+        board.make_move(*move)
+        ply += 1
+
+    diff = final_score(board.black, board.white)  # for Black
+    records = np.empty(len(rows), dtype=RECORD_DTYPE)
+    for i, (b, w, flags, score) in enumerate(rows):
+        records[i] = (b, w, flags, score, -diff if flags & WHITE_TO_MOVE else diff)
+    return records
+
+
+class ChunkWriter:
+    """Appends records to `directory` as numbered .npy chunks."""
+
+    def __init__(self, directory, chunk_size=1 << 20):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+        self._next = len(chunk_paths(directory))
+        self._pending = []
+        self._count = 0
+        self.written = 0
+
+    def write(self, records):
+        self._pending.append(records)
+        self._count += len(records)
+        if self._count >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._count:
+            return
+        records = np.concatenate(self._pending)
+        path = os.path.join(self.directory, f'chunk-{self._next:05d}.npy')
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, records)
+        os.replace(tmp, path)  # readers never see a partial chunk
+        self._next += 1
+        self.written += len(records)
+        self._pending, self._count = [], 0
+
+    def close(self):
+        self.flush()
+
+
+def chunk_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, 'chunk-*.npy')))
+
+
+def iter_records(directory, batch_size=65536):
+    """Yield record arrays of up to `batch_size`, mapping one chunk at a time."""
+    for path in chunk_paths(directory):
+        chunk = np.load(path, mmap_mode='r')
+        if chunk.dtype != RECORD_DTYPE:
+            raise ValueError(f"{path} does not hold self-play records")
+        for start in range(0, len(chunk), batch_size):
+            yield chunk[start:start + batch_size]
+        del chunk
+
+
+def generate(out, games, workers=None, depth=3, random_plies=8, endgame_empties=10,
+             chunk_size=1 << 20, seed=0, tt_size_mb=4):
+    """Play `games` games across a process pool and stream the records to `out`."""
+    writer = ChunkWriter(out, chunk_size)
+    seeds = [seed * 1_000_003 + i for i in range(games)]
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(depth, endgame_empties, tt_size_mb)) as pool:
+        for records in pool.map(play_game, seeds, [random_plies] * games, chunksize=4):
+            writer.write(records)
+    writer.close()
+    return writer.written
+
+
+def summary(directory):
+    count = exact = 0
+    results = np.zeros(3, dtype=np.int64)  # loss, draw, win for the side to move
+    for batch in iter_records(directory):
+        count += len(batch)
+        exact += int(np.count_nonzero(batch['flags'] & EXACT_SCORE))
+        results += np.bincount(np.sign(batch['result'].astype(np.int64)) + 1, minlength=3)
+    return {'records': count, 'exact': exact,
+            'losses': int(results[0]), 'draws': int(results[1]), 'wins': int(results[2])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate self-play training positions")
+    parser.add_argument('--out', default='selfplay')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--random-plies', type=int, default=8)
+    parser.add_argument('--endgame-empties', type=int, default=10)
+    parser.add_argument('--chunk-size', type=int, default=1 << 20, help="records per chunk file")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--summary', metavar='DIR', help="count the records in DIR and exit")
+    args = parser.parse_args(argv)
+
+    if args.summary:
+        print(summary(args.summary))
+        return
+    written = generate(args.out, args.games, args.workers, args.depth, args.random_plies,
+                       args.endgame_empties, args.chunk_size, args.seed)
+    print(f"{args.out}: {written} positions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""Serve the engine to many clients over TCP.
+
+One JSON object per line in each direction:
+
+    {"id": 1, "op": "bestmove", "moves": "f5d6c3", "time": 0.2, "deadline_ms": 500}
+    {"id": 1, "ok": true, "move": "c4", "score": 12, "depth": 7, "pv": ["c4", ...], ...}
+
+ops:
+    bestmove  search for `time` seconds (default 0.5) or `nodes` nodes
+    analyse   search to a fixed `depth` (default 6); also returns every iteration
+              and the search statistics
+    evaluate  static evaluation, answered without a search
+    stats     server counters
+
+`time` is capped at --max-time seconds, which also limits a `nodes`-only
+bestmove and every analyse; `depth` is capped at --max-depth.
+
+The position is either `moves` (a move list from the start; passes are
+implied) or the `black` and `white` bitboards plus `player` ("black" or
+"white").  Scores are from the side to move; an `exact` score is a solved
+final margin at engine.EXACT_SCALE per disc.
+
+Searches run on a process pool and identical requests in flight share one
+search, as long as that search's deadline is no earlier than the new
+request's.  `deadline_ms` bounds the whole request, queueing included.  Once
+--max-pending searches are waiting, new ones are refused with "busy", and
+a connection with --per-connection requests outstanding is not read from
+until one finishes.
+
+    python server.py --port 7070 --workers 8
+    python loadgen.py --port 7070 --clients 32 --requests 2000
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import time
+
+from board import Board, parse_moves, square_name
+from config import BLACK, WHITE
+from engine import Engine, evaluation_stamp
+from shared_table import SharedTable
+from time_control import TimeControl
+
+MAX_LINE = 1 << 16
+MAX_DEPTH = 16  # default caps on one search, so no request holds a worker for long
+MAX_TIME = 30.0
+# a search with a deadline stops this long before it, to get its reply
+# back to the event loop in time
+RETURN_MARGIN = 0.03
+
+_engine = None
+
+
+def _init_worker(strength, tt_size_mb, cache_path):
+    global _engine
+    table = None
+    if cache_path:
+        table = SharedTable(tt_size_mb, cache_path, stamp=evaluation_stamp(strength))
+    _engine = Engine(BLACK, strength, tt_size_mb=tt_size_mb, transposition=table)
+
+
+def _search(state, op, limit, deadline):
+    """Run one search in a worker; returns the response fields."""
+    if deadline is not None and time.time() >= deadline:
+        return {'ok': False, 'error': 'deadline exceeded'}
+    board = Board.from_bitboards(*state)
+    engine = _engine
+    engine.color = board.current_player  # search for the side to move
+    move_time = None
+    if deadline is not None:
+        move_time = max(deadline - time.time() - RETURN_MARGIN, 0.0)
+    if op == 'bestmove':
+        seconds, nodes = limit
+        depth = None
+    else:
+        depth, seconds = limit
+        nodes = None
+    move_time = seconds if move_time is None else min(seconds, move_time)
+    engine.time_control = TimeControl(move_time=move_time, max_nodes=nodes)
+    engine.max_depth = depth
+    move = engine.get_best_move(board)
+    result = {
+        'ok': True,
+        'move': None if move is None else square_name(move),
+        'score': engine.last_score,
+        'depth': engine.last_depth,
+        'exact': engine.last_exact,
+        'pv': [square_name(m) for m in engine.pv],
+        'nodes': engine.node_counter,
+    }
+    if op == 'analyse':
+        result['iterations'] = [{'depth': d, 'score': s, 'nodes': n, 'seconds': round(t, 4)}
+                                for d, s, n, t in engine.iterations]
+        result['stats'] = engine.stats.summary()
+    return result
+
+
+def board_from_request(request):
+    if 'moves' in request:
+        if not isinstance(request['moves'], str):
+            raise ValueError("moves must be a string such as 'f5d6c3'")
+        board = Board()
+        for move in parse_moves(request['moves']):
+            if board.must_pass():
+                board.pass_turn()
+            if not board.make_move(*move):
+                raise ValueError(f"illegal move: {square_name(move)}")
+        return board
+    if 'black' not in request or 'white' not in request:
+        raise ValueError("give the position as moves, or black and white bitboards")
+    player = request.get('player', 'black')
+    if player not in ('black', 'white'):
+        raise ValueError("player must be 'black' or 'white'")
+    player = BLACK if player == 'black' else WHITE
+    black, white = _bitboard(request, 'black'), _bitboard(request, 'white')
+    board = Board.from_bitboards(black, white, player)
+    if board.black & board.white:
+        raise ValueError("black and white overlap")
+    return board
+
+
+def _bitboard(request, name):
+    value = request[name]
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{name} must be an integer bitboard")
+    value = int(value)
+    if not 0 <= value < 1 << 64:
+        raise ValueError(f"{name} must be a 64-bit bitboard")
+    return value
+
+
+class EngineServer:
+    def __init__(self, workers=None, strength=4, tt_size_mb=16, cache_path=None,
+                 max_pending=256, per_connection=16, max_depth=MAX_DEPTH, max_time=MAX_TIME):
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(strength, tt_size_mb, cache_path))
+        self.evaluator = Engine(BLACK, strength)
+        self.max_pending = max_pending
+        self.per_connection = per_connection
+        self.max_depth = max_depth
+        self.max_time = max_time
+        self.in_flight = {}  # request key -> (future, deadline) of its latest search
+        self.pending = 0  # searches not yet finished
+        self.counters = {'requests': 0, 'searches': 0, 'shared': 0, 'busy': 0,
+                         'expired': 0, 'errors': 0}
+
+    async def handle(self, reader, writer):
+        slots = asyncio.Semaphore(self.per_connection)
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(request):
+            try:
+                try:
+                    response = await self.dispatch(request)
+                except (KeyError, ValueError, TypeError) as e:
+                    self.counters['errors'] += 1
+                    response = {'ok': False, 'error': str(e)}
+                except Exception as e:  # never leave a request unanswered
+                    self.counters['errors'] += 1
+                    response = {'ok': False, 'error': f"internal error: {type(e).__name__}"}
+                response['id'] = request.get('id')
+                async with lock:
+                    writer.write(json.dumps(response).encode() + b'\n')
+                    await writer.drain()
+            finally:
+                slots.release()
+
+        try:
+            while True:
+                await slots.acquire()  # backpressure: stop reading when full
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    request = {'op': 'invalid', 'error': str(e)}
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def dispatch(self, request):
+        self.counters['requests'] += 1
+        received = time.time()
+        op = request.get('op')
+        if op == 'invalid':
+            raise ValueError(request['error'])
+        if op == 'stats':
+            return {'ok': True, 'pending': self.pending, **self.counters}
+        board = board_from_request(request)
+        if op == 'evaluate':
+            self.evaluator.color = board.current_player
+            return {'ok': True, 'score': self.evaluator.static_eval(board)}
+        if op == 'bestmove':
+            time_limit = request.get('time')
+            nodes = request.get('nodes')
+            if time_limit is None:
+                time_limit = 0.5 if nodes is None else self.max_time
+            limit = (min(float(time_limit), self.max_time),
+                     None if nodes is None else int(nodes))
+        elif op == 'analyse':
+            limit = (max(1, min(int(request.get('depth', 6)), self.max_depth)), self.max_time)
+        else:
+            raise ValueError(f"unknown op: {op!r}")
+
+        deadline = None
+        if request.get('deadline_ms') is not None:
+            deadline = received + request['deadline_ms'] / 1000
+        key = (op, board.black, board.white, board.current_player, limit)
+        future, search_deadline = self.in_flight.get(key, (None, None))
+        # a search cut short by an earlier deadline is no answer for this one
+        if future is not None and not (search_deadline is None or (
+                deadline is not None and search_deadline >= deadline)):
+            future = None
+        if future is not None:
+            self.counters['shared'] += 1
+        else:
+            if self.pending >= self.max_pending:
+                self.counters['busy'] += 1
+                return {'ok': False, 'error': 'busy'}
+            self.counters['searches'] += 1
+            state = (board.black, board.white, board.current_player)
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.pool, _search, state, op, limit, deadline)
+            self.in_flight[key] = (future, deadline)
+            self.pending += 1
+            future.add_done_callback(lambda done: self._finished(key, done))
+
+        try:
+            timeout = None if deadline is None else max(deadline - time.time(), 0.0)
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            result = {'ok': False, 'error': 'deadline exceeded'}
+        if not result['ok']:
+            self.counters['expired'] += 1
+        return dict(result, elapsed_ms=round((time.time() - received) * 1000, 2))
+
+    def _finished(self, key, future):
+        self.pending -= 1
+        if self.in_flight.get(key, (None,))[0] is future:
+            del self.in_flight[key]
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def serve(args):
+    server = EngineServer(args.workers, args.strength, args.tt_size_mb, args.cache,
+                          args.max_pending, args.per_connection, args.max_depth, args.max_time)
+    listener = await asyncio.start_server(server.handle, args.host, args.port, limit=MAX_LINE)
+    print(f"listening on {args.host}:{args.port}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Othello engine server (JSON lines over TCP)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7070)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--strength', type=int, default=4)
+    parser.add_argument('--tt-size-mb', type=float, default=16)
+    parser.add_argument('--cache', help="file-backed transposition table shared by all workers")
+    parser.add_argument('--max-pending', type=int, default=256)
+    parser.add_argument('--per-connection', type=int, default=16)
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH, help="cap on analyse depth")
+    parser.add_argument('--max-time', type=float, default=MAX_TIME,
+                        help="cap on the seconds of any search")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import mmap
+import os
+import struct
+
+from transposition import ENTRY_BYTES, NO_MOVE
+
+MAGIC = b'OTHTT002'
+HEADER = struct.Struct('<8sQQQ')  # magic, capacity, stamp, generation
+MASK32 = 0xFFFF_FFFF
+
+
+class SharedTable:
+    """Transposition table in an mmap that several engines and processes share.
+
+    Same interface as transposition.TranspositionTable.  Each entry is two
+    64-bit words, (key ^ data, data), where data packs the score, depth,
+    bound, move and generation.  Writers never lock: a reader only accepts an
+    entry whose words XOR back to its key, so an entry torn by a concurrent
+    write just reads as a miss.
+
+    With `path`, the table lives in that file: any process can open the same
+    path to share it, and the contents survive restarts (call snapshot() to
+    flush).  Without a path it is anonymous shared memory, inherited by
+    processes forked after it was created.  Engines sharing a table must use
+    the same evaluation; `stamp` identifies it (engine.evaluation_stamp),
+    and a file written under another stamp or format is cleared on opening.
+    """
+
+    def __init__(self, size_mb: float = 64, path: str | None = None, policy: str = "depth",
+                 stamp: int = 0):
+        if policy not in ("depth", "always"):
+            raise ValueError(f"unknown replacement policy: {policy!r}")
+        entries = max(2, int(size_mb * 2**20) // ENTRY_BYTES)
+        self.capacity = 1 << (entries.bit_length() - 1)
+        self.mask = (self.capacity - 1) & ~1
+        self.policy = policy
+        self.path = path
+        self.size_mb = size_mb
+        self.stamp = stamp
+        length = HEADER.size + self.capacity * ENTRY_BYTES
+
+        self._file = None
+        if path is None:
+            self._map = mmap.mmap(-1, length)
+            HEADER.pack_into(self._map, 0, MAGIC, self.capacity, stamp, 0)
+        else:
+            fresh = not os.path.exists(path) or os.path.getsize(path) != length
+            self._file = open(path, 'r+b' if not fresh else 'w+b')
+            if fresh:
+                self._file.truncate(length)
+            self._map = mmap.mmap(self._file.fileno(), length)
+            magic, capacity, stored, _ = HEADER.unpack_from(self._map, 0)
+            if fresh or (magic, capacity, stored) != (MAGIC, self.capacity, stamp):
+                self._map[:] = bytes(length)
+                HEADER.pack_into(self._map, 0, MAGIC, self.capacity, stamp, 0)
+        self._words = memoryview(self._map)[HEADER.size:].cast('Q')
+        self.reset_stats()
+
+    def __reduce__(self):
+        # spawned processes re-open the file; anonymous tables only survive fork
+        if self.path is None:
+            raise TypeError("an anonymous SharedTable can only be shared by fork")
+        return SharedTable, (self.size_mb, self.path, self.policy, self.stamp)
+
+    @property
+    def generation(self):
+        return HEADER.unpack_from(self._map, 0)[3]
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def new_search(self):
+        HEADER.pack_into(self._map, 0, MAGIC, self.capacity, self.stamp,
+                         (self.generation + 1) & 0xFF)
+
+    def clear(self):
+        self._map[HEADER.size:] = bytes(self.capacity * ENTRY_BYTES)
+        HEADER.pack_into(self._map, 0, MAGIC, self.capacity, self.stamp, 0)
+        self.reset_stats()
+
+    def _read(self, slot):
+        """(key, data) of a slot, or (None, 0) if it is empty or torn."""
+        check, data = self._words[2 * slot], self._words[2 * slot + 1]
+        if not data:
+            return None, 0
+        return check ^ data, data
+
+    def probe(self, key):
+        self.probes += 1
+        i = key & self.mask
+        for slot in (i, i + 1):
+            stored, data = self._read(slot)
+            if stored == key:
+                self.hits += 1
+                score = data & MASK32
+                if score >= 1 << 31:
+                    score -= 1 << 32
+                move = data >> 48 & 0xFF
+                depth = data >> 32 & 0xFF
+                if depth >= 128:
+                    depth -= 256
+                return score, None if move == NO_MOVE else move, depth, data >> 40 & 0xFF
+        return None
+
+    def store(self, key, score, move, depth, flag):
+        self.stores += 1
+        generation = self.generation
+        i = key & self.mask
+        key0, data0 = self._read(i)
+        key1, _ = self._read(i + 1)
+        if key1 == key:
+            slot = i + 1
+        elif (self.policy == "always" or key0 is None or key0 == key
+                or data0 >> 56 != generation or depth >= ((data0 >> 32 & 0xFF) ^ 0x80) - 0x80):
+            slot = i
+        else:
+            slot = i + 1
+        if (key0 if slot == i else key1) not in (None, key):
+            self.collisions += 1
+        data = ((score & MASK32) | (depth & 0xFF) << 32 | flag << 40
+                | (NO_MOVE if move is None else move) << 48 | generation << 56)
+        self._words[2 * slot] = key ^ data
+        self._words[2 * slot + 1] = data
+
+    def stats(self):
+        sample = min(self.capacity, 4096)
+        used = sum(1 for i in range(sample) if self._words[2 * i + 1])
+        return {
+            'capacity': self.capacity,
+            'size_mb': self.capacity * ENTRY_BYTES / 2**20,
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+            'stores': self.stores,
+            'collisions': self.collisions,
+            'fill': used / sample,
+        }
+
+    def snapshot(self, path: str | None = None):
+        """Flush a file-backed table, or copy an anonymous one to `path`."""
+        if path is None or path == self.path:
+            self._map.flush()
+            return
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(self._map)
+        os.replace(tmp, path)
+
+    def close(self):
+        self._words.release()
+        self._map.close()
+        if self._file is not None:
+            self._file.close()
@@ -0,0 +1,130 @@
+"""The eight symmetries of the board, applied directly to bitboards.
+
+Transform t (0-7) is a combination of a vertical flip (bit 0), a horizontal
+mirror (bit 1) and a transpose about the a1-h8 diagonal (bit 2), applied in
+that order.
+"""
+from board import ZOBRIST_BLACK, ZOBRIST_WHITE, ZOBRIST_SIDE
+from config import WHITE
+
+K1 = 0x5555_5555_5555_5555
+K2 = 0x3333_3333_3333_3333
+K4 = 0x0F0F_0F0F_0F0F_0F0F
+D1 = 0x5500_5500_5500_5500
+D2 = 0x3333_0000_3333_0000
+D4 = 0x0F0F_0F0F_0000_0000
+
+
+def flip_vertical(x):
+    """Row r -> 7 - r."""
+    return int.from_bytes(x.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(x):
+    """Column c -> 7 - c."""
+    x = ((x >> 1) & K1) | ((x & K1) << 1)
+    x = ((x >> 2) & K2) | ((x & K2) << 2)
+    return ((x >> 4) & K4) | ((x & K4) << 4)
+
+
+def transpose(x):
+    """(r, c) -> (c, r)."""
+    t = D4 & (x ^ (x << 28))
+    x ^= t ^ (t >> 28)
+    t = D2 & (x ^ (x << 14))
+    x ^= t ^ (t >> 14)
+    t = D1 & (x ^ (x << 7))
+    return x ^ t ^ (t >> 7)
+
+
+def transform(x, t):
+    if t & 1:
+        x = flip_vertical(x)
+    if t & 2:
+        x = mirror_horizontal(x)
+    if t & 4:
+        x = transpose(x)
+    return x
+
+
+# SQUARE_MAP[t][sq] is where square sq lands under transform t
+SQUARE_MAP = tuple(
+    tuple(transform(1 << sq, t).bit_length() - 1 for sq in range(64))
+    for t in range(8)
+)
+# INVERSE[t] undoes transform t
+INVERSE = tuple(
+    next(u for u in range(8) if all(SQUARE_MAP[u][SQUARE_MAP[t][sq]] == sq for sq in range(64)))
+    for t in range(8)
+)
+
+
+# The same transforms on black << 64 | white, both boards in one pass: the
+# masks are repeated in each 64-bit lane and no shift crosses a lane.
+FULL = (1 << 64) - 1
+K1_2, K2_2, K4_2 = ((k << 64) | k for k in (K1, K2, K4))
+D1_2, D2_2, D4_2 = ((d << 64) | d for d in (D1, D2, D4))
+
+
+def _flip_vertical2(x):
+    x = int.from_bytes(x.to_bytes(16, 'little'), 'big')  # also swaps the lanes
+    return ((x & FULL) << 64) | (x >> 64)
+
+
+def _mirror_horizontal2(x):
+    x = ((x >> 1) & K1_2) | ((x & K1_2) << 1)
+    x = ((x >> 2) & K2_2) | ((x & K2_2) << 2)
+    return ((x >> 4) & K4_2) | ((x & K4_2) << 4)
+
+
+def _transpose2(x):
+    t = D4_2 & (x ^ (x << 28))
+    x ^= t ^ (t >> 28)
+    t = D2_2 & (x ^ (x << 14))
+    x ^= t ^ (t >> 14)
+    t = D1_2 & (x ^ (x << 7))
+    return x ^ t ^ (t >> 7)
+
+
+def canonical(black, white):
+    """(black, white, t): the smallest orientation of a position and the
+    transform that produces it."""
+    x = (black << 64) | white
+    v = _flip_vertical2(x)
+    h = _mirror_horizontal2(x)
+    vh = _mirror_horizontal2(v)
+    best, t = x, 0
+    for i, y in enumerate((v, h, vh, _transpose2(x), _transpose2(v),
+                           _transpose2(h), _transpose2(vh)), 1):
+        if y < best:
+            best, t = y, i
+    return best >> 64, best & FULL, t
+
+
+def _byte_keys(keys):
+    """[byte index][byte value] -> XOR of the keys of the set bits."""
+    table = []
+    for i in range(8):
+        row = [0] * 256
+        for value in range(1, 256):
+            low = value & -value
+            row[value] = row[value ^ low] ^ keys[i * 8 + low.bit_length() - 1]
+        table.append(tuple(row))
+    return tuple(table)
+
+
+_BLACK_BYTES = _byte_keys(ZOBRIST_BLACK)
+_WHITE_BYTES = _byte_keys(ZOBRIST_WHITE)
+
+
+def canonical_key(black, white, player):
+    """Zobrist key of the canonical orientation, plus the transform used."""
+    black, white, t = canonical(black, white)
+    key = ZOBRIST_SIDE if player == WHITE else 0
+    for i, byte in enumerate(black.to_bytes(8, 'little')):
+        if byte:
+            key ^= _BLACK_BYTES[i][byte]
+    for i, byte in enumerate(white.to_bytes(8, 'little')):
+        if byte:
+            key ^= _WHITE_BYTES[i][byte]
+    return key, t
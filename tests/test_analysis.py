@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from analysis import EVAL, HINT, MOVE, AnalysisService
+from board import Board, parse_moves
+from config import BLACK, WHITE
+from engine import Engine
+from time_control import TimeControl
+
+
+def position(moves):
+    board = Board()
+    for move in parse_moves(moves):
+        board.make_move(*move)
+    return board
+
+
+def wait_for(condition, timeout=10):
+    end = time.time() + timeout
+    while not condition():
+        assert time.time() < end, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def service():
+    service = AnalysisService(Engine(WHITE, endgame_empties=0))
+    yield service
+    service.close()
+
+
+def test_move_preempts_eval_which_resumes(service):
+    board = position('f5d6c3')
+    evaluation = service.submit(EVAL, board)
+    wait_for(lambda: evaluation.depth >= 2)
+    move = service.submit(MOVE, board, TimeControl(move_time=0.1))
+    wait_for(lambda: move.done)
+    assert move.move in board.get_valid_moves()
+    assert not evaluation.done and not evaluation.cancelled
+    depth = evaluation.depth
+    wait_for(lambda: evaluation.depth > depth)  # requeued and searching again
+
+
+def test_new_request_replaces_one_of_its_kind(service):
+    first = service.submit(EVAL, position('f5'))
+    wait_for(lambda: first.depth >= 1)
+    second = service.submit(EVAL, position('f5d6'))
+    assert first.cancelled
+    wait_for(lambda: second.depth >= 1)
+    service.cancel(EVAL)
+    assert second.cancelled and not second.done
+
+
+def test_scores_are_from_the_side_to_move(service):
+    board = position('f5')
+    hint = service.submit(HINT, board, TimeControl(move_time=0.1))
+    wait_for(lambda: hint.done)
+    assert hint.player == WHITE
+    assert hint.score_for(BLACK) == -hint.score_for(WHITE)
+
+
+def test_eval_follows_the_ponder_and_a_hint_stops_it():
+    engine = Engine(WHITE, endgame_empties=0)
+    service = AnalysisService(engine, ponder=True)
+    try:
+        board = position('f5')
+        move = service.submit(MOVE, board, TimeControl(move_time=0.2))
+        wait_for(lambda: move.done)
+        after = board.copy()
+        after.make_move(*move.move)
+        wait_for(lambda: engine.pondering is not None)
+        evaluation = service.submit(EVAL, after)
+        wait_for(lambda: evaluation.depth >= 2)
+        # published from the ponder search, which the eval left running
+        assert evaluation.pv[0] == service._pondered[1]
+        assert engine.pondering is not None
+
+        hint = service.submit(HINT, after, TimeControl(move_time=0.1))
+        wait_for(lambda: hint.done)
+        assert engine.pondering is None
+        assert engine.color == BLACK
+        assert hint.move in after.get_valid_moves()
+    finally:
+        service.close()
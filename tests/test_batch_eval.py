@@ -0,0 +1,51 @@
+import random
+from array import array
+
+import numpy as np
+import pytest
+
+import patterns
+from batch_eval import evaluate_batch
+from board import Board
+from config import BLACK, WHITE
+from engine import Engine
+
+
+def random_positions(count=40, seed=1):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board()
+        while not board.game_over():
+            if board.must_pass():
+                board.pass_turn()
+            board.make_move(*rng.choice(board.get_valid_moves()))
+            positions.append(board.copy())
+    return positions[:count]
+
+
+def random_weights(seed=1):
+    rng = np.random.default_rng(seed)
+    return patterns.PatternWeights(
+        [array('h', rng.integers(-64, 64, patterns.FEATURES).tolist())
+         for _ in range(patterns.N_PHASES)])
+
+
+@pytest.mark.parametrize('strength', [1, 2, 3, 4, 5])
+@pytest.mark.parametrize('color', [BLACK, WHITE])
+def test_matches_static_eval(strength, color):
+    weights = random_weights() if strength == 5 else None
+    engine = Engine(color, strength, patterns=weights)
+    positions = random_positions()
+    expected = [engine.static_eval(board) for board in positions]
+    assert evaluate_batch(positions, color, strength, weights).tolist() == expected
+
+
+def test_array_inputs_match_boards():
+    positions = random_positions()
+    bitboards = np.array([(b.black, b.white) for b in positions], dtype=np.uint64)
+    cells = np.array([[1 if b.black >> sq & 1 else -1 if b.white >> sq & 1 else 0
+                       for sq in range(64)] for b in positions], dtype=np.int8)
+    expected = evaluate_batch(positions, BLACK).tolist()
+    assert evaluate_batch(bitboards, BLACK).tolist() == expected
+    assert evaluate_batch(cells, BLACK).tolist() == expected
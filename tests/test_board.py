@@ -0,0 +1,19 @@
+import pytest
+
+from board import Board, PERFT_START, parse_moves
+
+
+@pytest.mark.parametrize('depth', range(7))
+def test_perft_start(depth):
+    assert Board().perft(depth) == PERFT_START[depth]
+
+
+def test_perft_divide_sums_to_total():
+    board = Board()
+    for move in parse_moves('f5d6c3'):
+        board.make_move(*move)
+    assert sum(board.perft(4, divide=True).values()) == board.perft(4)
+
+
+def test_perft_check():
+    assert Board().perft(5, check=True) == PERFT_START[5]
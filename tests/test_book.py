@@ -0,0 +1,57 @@
+import pytest
+
+from board import Board
+from book import OpeningBook, positions_from_lines, positions_from_start, write_book
+from symmetry import SQUARE_MAP, canonical_key, transform
+
+# a full game with a pass at ply 58
+GAME = ('c4c5f6c3b5g7e3e6c2f3g3a5h8b3f4f2b4f5f7h3a3d2e2e1a6e7d7c1c6g8f1g4d1b6b1'
+        'd3g6b7f8a7c7h6a8b2g5g2a1d6h2h5a4d8c8h7e8a2h4b8g1h1')
+
+
+def key_after(board, move):
+    child = board.copy()
+    child.make_move(*move)
+    return canonical_key(child.black, child.white, child.current_player)[0]
+
+
+def test_moves_map_back_for_every_orientation(tmp_path):
+    positions = positions_from_start(3)
+    entries, chosen = {}, {}
+    for board in positions:
+        move = max(board.get_valid_moves())
+        key, t = canonical_key(board.black, board.white, board.current_player)
+        entries[key] = (len(entries), SQUARE_MAP[t][move[0] * 8 + move[1]], 4)
+        chosen[key] = key_after(board, move)
+    path = str(tmp_path / 'book.bin')
+    write_book(path, entries)
+
+    book = OpeningBook(path)
+    try:
+        assert len(book) == len(entries)
+        for board in positions:
+            for t in range(8):
+                image = Board.from_bitboards(transform(board.black, t), transform(board.white, t),
+                                             board.current_player)
+                move, score, depth = book.probe(image)
+                assert move in image.get_valid_moves()
+                # the book move leads to the same position as the one stored
+                key = canonical_key(image.black, image.white, image.current_player)[0]
+                assert key_after(image, move) == chosen[key]
+        deeper = positions_from_lines([GAME], 5)[-1]  # four plies in: out of book
+        assert book.probe(deeper) is None
+    finally:
+        book.close()
+
+
+def test_positions_from_lines_imply_passes():
+    positions = positions_from_lines(['# comment', '', GAME], 64)
+    assert len(positions) == len(GAME) // 2
+    assert positions[0].black == Board().black
+
+
+def test_positions_from_lines_reject_illegal_moves():
+    with pytest.raises(ValueError, match='line 2: illegal move a1'):
+        positions_from_lines(['f5d6', 'f5a1d6c3'], 8)
+    with pytest.raises(ValueError, match='line 1: bad square'):
+        positions_from_lines(['f5zz'], 8)
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from board import Board, legal_moves, flips
+from endgame import EndgameSolver, bit_squares, final_score
+from engine import EXACT_SCALE, Engine
+from time_control import TimeControl
+
+
+def brute_force(own, opp, passed=False):
+    """Exact minimax of the final margin, for the side to move (`own`)."""
+    moves = legal_moves(own, opp)
+    if not moves:
+        if passed:
+            return final_score(own, opp)
+        return -brute_force(opp, own, True)
+    best = -64
+    for sq in bit_squares(moves):
+        f = flips(own, opp, sq)
+        best = max(best, -brute_force(opp ^ f, own | f | (1 << sq)))
+    return best
+
+
+def endgame_positions(empties, count, seed=0):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board()
+        while not board.game_over() and 64 - (board.black | board.white).bit_count() > empties:
+            if board.must_pass():
+                board.pass_turn()
+            board.make_move(*rng.choice(board.get_valid_moves()))
+        if not board.game_over() and board.get_valid_moves():
+            positions.append(board)
+    return positions
+
+
+@pytest.mark.parametrize('empties', [1, 4, 7])
+def test_solve_matches_brute_force(empties):
+    solver = EndgameSolver()
+    for board in endgame_positions(empties, 15, seed=empties):
+        own, opp = board.bitboards()
+        score, sq = solver.solve(own, opp)
+        assert score == brute_force(own, opp)
+        f = flips(own, opp, sq)  # the move returned reaches that score
+        assert -brute_force(opp ^ f, own | f | (1 << sq)) == score
+
+
+def test_engine_reports_solved_scores_in_scaled_units():
+    for board in endgame_positions(6, 5, seed=1):
+        engine = Engine(board.current_player, time_control=TimeControl(move_time=5))
+        engine.get_best_move(board)
+        assert engine.last_exact
+        assert engine.last_score == brute_force(*board.bitboards()) * EXACT_SCALE
+
+
+def test_solver_skipped_when_it_cannot_fit_the_budget():
+    board, = endgame_positions(12, 1, seed=2)
+    engine = Engine(board.current_player, time_control=TimeControl(move_time=0.1))
+    assert engine.get_best_move(board) in board.get_valid_moves()
+    assert not engine.last_exact
+    assert engine.last_depth > 2  # the heuristic search had the whole budget
+
+
+def test_multi_pv_solves_every_root_move():
+    for board in endgame_positions(6, 5, seed=3):
+        engine = Engine(board.current_player, multi_pv=2)
+        engine.time_control = TimeControl()
+        engine.get_best_move(board)
+        own, opp = board.bitboards()
+        exact = {}
+        for move in board.get_valid_moves():
+            sq = move[0] * 8 + move[1]
+            f = flips(own, opp, sq)
+            exact[move] = -brute_force(opp ^ f, own | f | (1 << sq))
+        assert engine.last_exact
+        assert len(engine.lines) == min(2, len(exact))
+        assert [s for s, _, _ in engine.lines] == \
+            sorted((s * EXACT_SCALE for s in exact.values()), reverse=True)[:2]
+        assert all(s == exact[m] * EXACT_SCALE for s, m, _ in engine.lines)
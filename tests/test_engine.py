@@ -0,0 +1,101 @@
+from bench import position
+from config import BLACK, WHITE
+from engine import Engine
+from time_control import TimeControl
+
+
+def search(engine, board, depth):
+    engine.time_control = TimeControl()
+    engine.max_depth = depth
+    move = engine.get_best_move(board)
+    return move, engine.last_score
+
+
+def test_pool_workers_follow_the_engine_colour():
+    board = position('midgame')
+    side, other = board.current_player, WHITE if board.current_player == BLACK else BLACK
+    expected = search(Engine(side, endgame_empties=0), board, 4)[1]
+
+    engine = Engine(other, workers=2, endgame_empties=0)
+    try:
+        search(engine, board, 3)  # starts the pool with the other colour
+        engine.color = side
+        engine.transposition.clear()
+        assert search(engine, board, 4)[1] == expected
+    finally:
+        engine.close()
+
+
+def _after(board, move):
+    board = board.copy()
+    board.make_move(*move)
+    return board
+
+
+def test_ponder_hit_uses_the_background_search():
+    board = position('midgame')
+    engine = Engine(board.current_player, endgame_empties=0)
+    move = search(engine, board, 4)[0]
+    opponent = _after(board, move)
+    reply = engine.ponder(opponent)
+    assert reply in opponent.get_valid_moves()
+    expected = _after(opponent, reply)
+    assert engine.pondering.zobrist == expected.zobrist
+
+    engine.time_control = TimeControl(move_time=0.2)
+    answer = engine.get_best_move(expected)
+    assert (engine.ponder_hits, engine.ponder_misses) == (1, 0)
+    assert engine.pondering is None
+    assert answer in expected.get_valid_moves()
+
+
+def test_ponder_miss_cancels_and_searches_afresh():
+    board = position('midgame')
+    engine = Engine(board.current_player, endgame_empties=0)
+    move = search(engine, board, 4)[0]
+    opponent = _after(board, move)
+    reply = engine.ponder(opponent)
+    other = next(m for m in opponent.get_valid_moves() if m != reply)
+    actual = _after(opponent, other)
+
+    engine.time_control = TimeControl(move_time=0.2)
+    answer = engine.get_best_move(actual)
+    assert (engine.ponder_hits, engine.ponder_misses) == (0, 1)
+    assert engine.pondering is None
+    assert answer in actual.get_valid_moves()
+
+
+def test_ponder_falls_back_to_the_table_move():
+    board = position('midgame')
+    engine = Engine(board.current_player, endgame_empties=0)
+    move = search(engine, board, 4)[0]
+    engine.pv = engine.pv[:1]  # as if a table hit had cut the PV short
+    opponent = _after(board, move)
+    try:
+        assert engine.ponder(opponent) in opponent.get_valid_moves()
+    finally:
+        engine.stop_ponder()
+    assert engine.pondering is None
+
+
+def test_multi_pv_lines_are_the_best_root_moves():
+    board = position('midgame')
+    engine = Engine(board.current_player, endgame_empties=0, multi_pv=3)
+    move, score = search(engine, board, 4)
+    moves = [line[1] for line in engine.lines]
+    scores = [line[0] for line in engine.lines]
+    assert len(engine.lines) == 3 and len(set(moves)) == 3
+    assert set(moves) <= set(board.get_valid_moves())
+    assert scores == sorted(scores, reverse=True)
+    assert (score, move) == (scores[0], moves[0])
+    assert all(pv[0] == m for _, m, pv in engine.lines)
+
+    single = search(Engine(board.current_player, endgame_empties=0), board, 4)[1]
+    assert scores[0] == single
+    children = {}
+    for m in board.get_valid_moves():
+        child = _after(board, m)
+        children[m] = -search(Engine(child.current_player, endgame_empties=0), child, 3)[1]
+    best = sorted(children.values(), reverse=True)[:3]
+    assert scores == best
+    assert all(children[m] == s for s, m, _ in engine.lines)
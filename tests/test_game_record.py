@@ -0,0 +1,97 @@
+import pytest
+
+from board import Board, parse_moves
+from config import WHITE
+from game_record import PASS, GameRecord, read_games, write_games, append_games
+
+# a full game with one pass
+GAME = ('c4c5f6c3b5g7e3e6c2f3g3a5h8b3f4f2b4f5f7h3a3d2e2e1a6e7d7c1c6g8f1g4d1b6b1'
+        'd3g6b7f8a7c7h6a8b2g5g2a1d6h2h5a4d8c8h7e8a2h4b8g1h1')
+
+
+def test_from_moves_replays_the_game():
+    board = Board()
+    for move in parse_moves(GAME):
+        if board.must_pass():
+            board.pass_turn()
+        assert board.make_move(*move)
+    record = GameRecord.from_moves(GAME)
+    assert record.text() == GAME
+    assert record.state(len(record)) == (board.black, board.white, board.current_player)
+
+
+def test_from_moves_records_the_pass():
+    assert GameRecord.from_moves(GAME).plies.count(PASS) == 1
+
+
+@pytest.mark.parametrize('custom_start', [False, True])
+def test_bytes_round_trip(custom_start):
+    if custom_start:
+        board = Board()
+        board.make_move(*parse_moves('f5')[0])
+        record = GameRecord.from_moves('d6c3', start=(board.black, board.white, WHITE))
+    else:
+        record = GameRecord.from_moves(GAME)
+    data = b'junk' + record.to_bytes()
+    decoded, end = GameRecord.from_bytes(data, 4)
+    assert end == len(data)
+    assert decoded.plies == record.plies
+    assert decoded.start == record.start
+    assert decoded.state(len(decoded)) == record.state(len(record))
+
+
+def test_undo_redo():
+    record = GameRecord.from_moves(GAME, snapshot_every=4)
+    final = record.state(len(record))
+    for ply in range(len(record), 0, -1):
+        assert record.undo()
+        assert record.cursor == ply - 1
+        assert record.board().black == record.state(ply - 1)[0]
+    assert not record.undo()
+    while record.redo():
+        pass
+    assert record.cursor == len(record)
+    board = record.board()
+    assert (board.black, board.white, board.current_player) == final
+
+
+def test_append_after_undo_keeps_redo_or_truncates():
+    record = GameRecord.from_moves('f5d6c3d3')
+    record.undo()
+    record.undo()
+    record.append(parse_moves('c3')[0])  # the undone move: a redo
+    assert len(record) == 4 and record.cursor == 3
+    record.append(parse_moves('f4')[0])  # a different move drops the rest
+    assert record.text() == 'f5d6c3f4'
+    assert record.cursor == 4
+
+
+def test_illegal_move_and_pass():
+    record = GameRecord()
+    with pytest.raises(ValueError):
+        record.append((0, 0))
+    with pytest.raises(ValueError):
+        record.append(None)
+    assert not len(record)
+
+
+def test_games_file(tmp_path):
+    path = str(tmp_path / 'games.bin')
+    records = [GameRecord.from_moves(GAME), GameRecord.from_moves('f5d6')]
+    assert write_games(path, records[:1]) == 1
+    assert append_games(path, records[1:]) == 1
+    assert [r.plies for r in read_games(path)] == [r.plies for r in records]
+
+
+def test_failed_write_leaves_no_partial_file(tmp_path):
+    path = str(tmp_path / 'games.bin')
+    write_games(path, [GameRecord.from_moves('f5d6')])
+
+    def records():
+        yield GameRecord.from_moves(GAME)
+        yield GameRecord.from_moves('f5f5')
+
+    with pytest.raises(ValueError):
+        write_games(path, records())
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['games.bin']
+    assert [r.text() for r in read_games(path)] == ['f5d6']
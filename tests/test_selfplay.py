@@ -0,0 +1,19 @@
+import selfplay
+from board import Board
+from config import BLACK, WHITE
+
+
+def test_records_start_after_the_random_opening():
+    selfplay._init_worker(1, 6, 1)
+    records = selfplay.play_game(seed=3, random_plies=10)
+    # the ten random plies leave no record; the first is the eleventh position
+    first = records[0]
+    assert (int(first['black']) | int(first['white'])).bit_count() == 4 + 10
+    for record in records:
+        player = WHITE if record['flags'] & selfplay.WHITE_TO_MOVE else BLACK
+        board = Board.from_bitboards(int(record['black']), int(record['white']), player)
+        assert board.get_valid_moves()
+    exact = records[records['flags'] & selfplay.EXACT_SCORE != 0]
+    assert len(exact)
+    # both sides play the solved line, so exact scores are the results
+    assert (exact['score'] == exact['result']).all()
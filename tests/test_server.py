@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from server import EngineServer
+
+BAD_REQUESTS = [
+    (b'not json', 'Expecting value'),
+    (b'[1, 2]', 'JSON object'),
+    (b'{"op": "evaluate", "moves": 5}', 'moves must be a string'),
+    (b'{"op": "evaluate", "moves": "f5zz"}', 'bad square'),
+    (b'{"op": "evaluate", "moves": "a1"}', 'illegal move'),
+    (b'{"op": "evaluate", "black": 18446744073709551616, "white": 0}', '64-bit'),
+    (b'{"op": "evaluate", "black": true, "white": 0}', 'integer bitboard'),
+    (b'{"op": "evaluate", "black": 1, "white": 1}', 'overlap'),
+    (b'{"op": "evaluate", "black": 1, "white": 2, "player": [1]}', 'player'),
+    (b'{"op": "evaluate"}', 'give the position'),
+    (b'{"op": "bestmove", "moves": "f5", "time": "soon"}', 'soon'),
+    (b'{"op": "frobnicate", "moves": "f5"}', 'frobnicate'),
+]
+
+
+async def exchange(server, lines):
+    """Send `lines` on one connection; the replies, by id."""
+    listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for line in lines:
+        writer.write(line + b'\n')
+    await writer.drain()
+    replies = [json.loads(await reader.readline()) for _ in lines]
+    writer.close()
+    await writer.wait_closed()
+    listener.close()
+    await listener.wait_closed()
+    return replies
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = EngineServer(workers=1, max_depth=3)
+    yield server
+    server.close()
+
+
+def test_every_bad_request_gets_an_error_reply(server):
+    replies = asyncio.run(exchange(server, [line for line, _ in BAD_REQUESTS]))
+    assert len(replies) == len(BAD_REQUESTS)
+    for reply in replies:
+        assert reply['ok'] is False
+    errors = sorted(reply['error'] for reply in replies)
+    for _, fragment in BAD_REQUESTS:
+        assert any(fragment in error for error in errors), fragment
+
+
+def test_replies_keep_their_ids(server):
+    lines = [b'{"id": 7, "op": "evaluate", "moves": 5}',
+             b'{"id": 8, "op": "evaluate", "moves": "f5"}']
+    replies = {reply['id']: reply for reply in asyncio.run(exchange(server, lines))}
+    assert replies[7]['ok'] is False
+    assert replies[8]['ok'] is True
+
+
+def test_analyse_depth_is_capped(server):
+    reply, = asyncio.run(exchange(server, [b'{"op": "analyse", "moves": "f5d6", "depth": 99}']))
+    assert reply['ok'] is True
+    assert reply['depth'] == 3
+
+
+def test_search_up_to_the_deadline_still_answers(server):
+    line = b'{"op": "bestmove", "moves": "f5d6c3d3c4", "time": 0.5, "deadline_ms": 200}'
+    for _ in range(3):  # the search runs up to the deadline, less the return margin
+        reply, = asyncio.run(exchange(server, [line]))
+        assert reply['ok'] is True, reply
+        assert reply['depth'] > 1
+
+
+def test_analyse_time_is_capped():
+    server = EngineServer(workers=1, max_depth=60, max_time=0.2)
+    try:
+        start = time.perf_counter()
+        reply, = asyncio.run(exchange(server, [b'{"op": "analyse", "moves": "f5d6c3d3c4", "depth": 60}']))
+        assert reply['ok'] is True
+        assert reply['depth'] < 60
+        assert time.perf_counter() - start < 5
+    finally:
+        server.close()
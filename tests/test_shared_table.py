@@ -0,0 +1,63 @@
+import multiprocessing
+import pickle
+
+from engine import evaluation_stamp
+from shared_table import SharedTable
+from transposition import EXACT, LOWER
+
+
+def test_store_and_probe():
+    table = SharedTable(0.01)
+    table.store(12345, -70, 19, 5, LOWER)
+    table.store(54321, 3, None, -1, EXACT)
+    assert table.probe(12345) == (-70, 19, 5, LOWER)
+    assert table.probe(54321) == (3, None, -1, EXACT)
+    assert table.probe(99999) is None
+    table.close()
+
+
+def test_torn_entry_reads_as_a_miss():
+    table = SharedTable(0.01)
+    table.store(12345, 7, 3, 5, EXACT)
+    slot = next(i for i in range(table.capacity) if table._words[2 * i + 1])
+    table._words[2 * slot + 1] ^= 1 << 33  # as if another writer were half done
+    assert table.probe(12345) is None
+    table.close()
+
+
+def test_reopen_keeps_entries_with_the_same_stamp(tmp_path):
+    path = str(tmp_path / 'cache.bin')
+    stamp = evaluation_stamp(4)
+    table = SharedTable(0.01, path, stamp=stamp)
+    table.store(12345, 7, 3, 5, EXACT)
+    table.new_search()
+    table.snapshot()
+    table.close()
+
+    table = SharedTable(0.01, path, stamp=stamp)
+    assert table.probe(12345) == (7, 3, 5, EXACT)
+    assert table.generation == 1
+    table.close()
+
+    table = SharedTable(0.01, path, stamp=evaluation_stamp(3))  # another evaluation
+    assert table.probe(12345) is None
+    table.close()
+
+    table = SharedTable(0.02, path, stamp=evaluation_stamp(3))  # another size
+    assert table.capacity > 0 and table.probe(12345) is None
+    table.close()
+
+
+def _store_in_child(table):
+    table.store(777, 11, 2, 4, EXACT)
+
+
+def test_shared_between_processes(tmp_path):
+    table = SharedTable(0.01, str(tmp_path / 'cache.bin'), stamp=5)
+    assert pickle.loads(pickle.dumps(table)).stamp == 5
+    child = multiprocessing.get_context('spawn').Process(target=_store_in_child, args=(table,))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+    assert table.probe(777) == (11, 2, 4, EXACT)
+    table.close()
@@ -0,0 +1,83 @@
+import random
+
+from bench import position
+from board import Board, ZOBRIST_BLACK, ZOBRIST_WHITE, ZOBRIST_SIDE
+from config import WHITE
+from engine import Engine
+from symmetry import INVERSE, SQUARE_MAP, canonical, canonical_key, transform
+from time_control import TimeControl
+
+
+def random_position(plies, seed):
+    rng = random.Random(seed)
+    board = Board()
+    for _ in range(plies):
+        moves = board.get_valid_moves()
+        if not moves:
+            break
+        board.make_move(*rng.choice(moves))
+    return board
+
+
+def zobrist(black, white, player):
+    key = ZOBRIST_SIDE if player == WHITE else 0
+    for sq in range(64):
+        if black >> sq & 1:
+            key ^= ZOBRIST_BLACK[sq]
+        if white >> sq & 1:
+            key ^= ZOBRIST_WHITE[sq]
+    return key
+
+
+def test_square_map_round_trips():
+    for t in range(8):
+        assert sorted(SQUARE_MAP[t]) == list(range(64))
+        for sq in range(64):
+            assert SQUARE_MAP[INVERSE[t]][SQUARE_MAP[t][sq]] == sq
+            assert transform(1 << sq, t) == 1 << SQUARE_MAP[t][sq]
+
+
+def test_canonical_is_the_same_for_every_image():
+    for seed in range(20):
+        board = random_position(8, seed)
+        black, white, t = canonical(board.black, board.white)
+        assert (transform(board.black, t), transform(board.white, t)) == (black, white)
+        key, key_t = canonical_key(board.black, board.white, board.current_player)
+        assert (key, key_t) == (zobrist(black, white, board.current_player), t)
+        for u in range(8):
+            image = transform(board.black, u), transform(board.white, u)
+            assert canonical(*image)[:2] == (black, white)
+            assert canonical_key(*image, board.current_player)[0] == key
+
+
+def test_symmetric_keys_keep_scores_and_moves():
+    for seed in range(4):
+        board = random_position(4, seed)
+        results = []
+        for symmetry_discs in (0, 64):
+            engine = Engine(board.current_player, endgame_empties=0,
+                            symmetry_discs=symmetry_discs)
+            engine.time_control = TimeControl()
+            engine.max_depth = 5
+            move = engine.get_best_move(board)
+            assert move in board.get_valid_moves()
+            results.append(engine.last_score)
+        assert results[0] == results[1]
+
+
+def test_table_move_maps_back_to_the_position():
+    board = position('opening')
+    engine = Engine(board.current_player, endgame_empties=0, symmetry_discs=64)
+    engine.time_control = TimeControl()
+    engine.max_depth = 4
+    engine.get_best_move(board)
+    checked = 0
+    for move in board.get_valid_moves():
+        child = board.copy()
+        child.make_move(*move)
+        key, t = canonical_key(child.black, child.white, child.current_player)
+        entry = engine.transposition.probe(key)
+        if entry is not None and entry[1] is not None:
+            assert divmod(SQUARE_MAP[INVERSE[t]][entry[1]], 8) in child.get_valid_moves()
+            checked += 1
+    assert checked
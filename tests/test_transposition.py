@@ -0,0 +1,69 @@
+import pytest
+
+from bench import position
+from engine import Engine
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+
+def bucket_keys(table, count, base=6):
+    """Keys that all index the same two-slot bucket."""
+    return [base + i * table.capacity for i in range(count)]
+
+
+def test_store_and_probe():
+    table = TranspositionTable(0.01)
+    table.store(12345, -70, 19, 5, LOWER)
+    table.store(54321, 3, None, -1, EXACT)
+    assert table.probe(12345) == (-70, 19, 5, LOWER)
+    assert table.probe(54321) == (3, None, -1, EXACT)
+    assert table.probe(99999) is None
+    table.clear()
+    assert table.probe(12345) is None
+
+
+def test_depth_policy_keeps_the_deepest_entry_of_a_search():
+    table = TranspositionTable(0.01)
+    deep, shallow, other = bucket_keys(table, 3)
+    table.store(deep, 1, 0, 8, EXACT)
+    table.store(shallow, 2, 0, 3, EXACT)  # goes to the always-replace slot
+    table.store(other, 3, 0, 2, EXACT)  # and evicts it
+    assert table.probe(deep) is not None
+    assert table.probe(shallow) is None
+    assert table.probe(other) is not None
+    table.new_search()  # entries of an older search give way to any depth
+    table.store(shallow, 2, 0, 1, EXACT)
+    assert table.probe(deep) is None
+    assert table.probe(shallow) is not None
+
+
+def test_always_policy_replaces_the_first_slot():
+    table = TranspositionTable(0.01, policy="always")
+    deep, shallow = bucket_keys(table, 2)
+    table.store(deep, 1, 0, 8, EXACT)
+    table.store(shallow, 2, 0, 1, EXACT)
+    assert table.probe(deep) is None
+    assert table.probe(shallow) == (2, 0, 1, EXACT)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        TranspositionTable(1, policy="sometimes")
+
+
+def root_entry(alpha, beta, depth=3):
+    board = position('midgame')  # past symmetry_discs: keyed by board.zobrist
+    engine = Engine(board.current_player)
+    score, _ = engine.negamax(board, depth, alpha, beta, 1)
+    return score, engine.transposition.probe(board.zobrist)
+
+
+def test_bound_flags():
+    inf = float('inf')
+    value, entry = root_entry(-inf, inf)
+    assert entry[0] == value and entry[2] == 3 and entry[3] == EXACT
+
+    score, entry = root_entry(value + 10, value + 20)  # fails low
+    assert score <= value + 10 and entry[3] == UPPER and entry[0] >= value
+
+    score, entry = root_entry(value - 20, value - 10)  # fails high
+    assert score >= value - 10 and entry[3] == LOWER and entry[0] <= value
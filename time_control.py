@@ -0,0 +1,38 @@
+class TimeControl:
+    """Decides how much time and how many nodes one search may use.
+
+    Three modes, which can be combined:
+      * move_time: a fixed number of seconds per move;
+      * game_time + increment: a game clock that is charged after every
+        search and topped up by `increment` seconds per move;
+      * max_nodes: a node budget per move (independent of the clock).
+    """
+
+    def __init__(self, move_time: float | None = None, game_time: float | None = None,
+                 increment: float = 0.0, max_nodes: int | None = None,
+                 safety: float = 0.02):
+        self.move_time = move_time
+        self.remaining = game_time
+        self.increment = increment
+        self.max_nodes = max_nodes
+        self.safety = safety  # seconds held back for returning the move
+
+    def budget(self, board):
+        """Seconds available for the next move, or None for no time limit."""
+        limits = []
+        if self.move_time is not None:
+            limits.append(self.move_time)
+        if self.remaining is not None:
+            # roughly one move per side for every two empty squares left
+            empties = 64 - (board.black | board.white).bit_count()
+            moves_left = max(empties // 2, 1)
+            share = self.remaining / moves_left + 0.8 * self.increment
+            limits.append(min(share, self.remaining - self.safety))
+        if not limits:
+            return None
+        return max(min(limits), 0.0)
+
+    def consume(self, elapsed):
+        """Charge a finished search to the game clock."""
+        if self.remaining is not None:
+            self.remaining = max(self.remaining - elapsed, 0.0) + self.increment
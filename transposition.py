@@ -0,0 +1,101 @@
+from array import array
+
+# bound types stored with each entry (0 marks an empty slot)
+EXACT, LOWER, UPPER = 1, 2, 3
+NO_MOVE = 255
+
+# key (8) + score (4) + depth, flag, move, age (1 each)
+ENTRY_BYTES = 16
+
+
+class TranspositionTable:
+    """Fixed-size transposition table backed by flat arrays.
+
+    Entries live in two-slot buckets indexed by the Zobrist key.  With the
+    "depth" policy the first slot keeps the deepest result of the current
+    search generation and the second slot is always replaced; with "always"
+    the first slot is simply overwritten.  Memory is allocated once and never
+    grows.
+    """
+
+    def __init__(self, size_mb: float = 16, policy: str = "depth"):
+        if policy not in ("depth", "always"):
+            raise ValueError(f"unknown replacement policy: {policy!r}")
+        entries = max(2, int(size_mb * 2**20) // ENTRY_BYTES)
+        self.capacity = 1 << (entries.bit_length() - 1)
+        self.mask = (self.capacity - 1) & ~1  # index of the bucket's first slot
+        self.policy = policy
+        self.keys = array('Q', [0]) * self.capacity
+        self.scores = array('i', [0]) * self.capacity
+        self.depths = array('b', [0]) * self.capacity
+        self.flags = array('B', [0]) * self.capacity
+        self.moves = array('B', [NO_MOVE]) * self.capacity
+        self.ages = array('B', [0]) * self.capacity
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0  # stores that evicted a different position
+
+    def new_search(self):
+        """Age existing entries so the next search prefers to replace them."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        for i in range(self.capacity):
+            self.flags[i] = 0
+        self.generation = 0
+        self.reset_stats()
+
+    def probe(self, key):
+        """Return (score, move, depth, flag) for `key`, or None on a miss.
+
+        `move` is a square index, or None if no best move was stored.
+        """
+        self.probes += 1
+        i = key & self.mask
+        for slot in (i, i + 1):
+            if self.flags[slot] and self.keys[slot] == key:
+                self.hits += 1
+                move = self.moves[slot]
+                return (self.scores[slot], None if move == NO_MOVE else move,
+                        self.depths[slot], self.flags[slot])
+        return None
+
+    def store(self, key, score, move, depth, flag):
+        """Record a search result; `move` is a square index or None."""
+        self.stores += 1
+        i = key & self.mask
+        if self.flags[i + 1] and self.keys[i + 1] == key:
+            slot = i + 1
+        elif (self.policy == "always" or not self.flags[i] or self.keys[i] == key
+                or self.ages[i] != self.generation or depth >= self.depths[i]):
+            slot = i
+        else:
+            slot = i + 1
+        if self.flags[slot] and self.keys[slot] != key:
+            self.collisions += 1
+        self.keys[slot] = key
+        self.scores[slot] = score
+        self.depths[slot] = depth
+        self.flags[slot] = flag
+        self.moves[slot] = NO_MOVE if move is None else move
+        self.ages[slot] = self.generation
+
+    def stats(self):
+        """Counters for tuning the table size and policy."""
+        sample = min(self.capacity, 4096)
+        used = sum(1 for i in range(sample) if self.flags[i])
+        return {
+            'capacity': self.capacity,
+            'size_mb': self.capacity * ENTRY_BYTES / 2**20,
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+            'stores': self.stores,
+            'collisions': self.collisions,
+            'fill': used / sample,
+        }
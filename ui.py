@@ -1,14 +1,14 @@
 import pygame
 import pygame.gfxdraw
 from config import *
+from display import FONT, BUTTON_FONT
 
 def draw_ui(win, gm):
     board = gm.board
     win.fill(GREEN)
 
     # ─── evaluation bar (smooth) ──────────────────────────────────
-    raw_pct = (gm.bar_ai.eval_bar_score + 1000) / 2000
-    raw_pct = max(0.0, min(raw_pct, 1.0))
+    raw_pct = (gm.eval_bar_score + 1) / 2
 
     # keep a float for sub-pixel smoothing
     if not hasattr(gm, "smooth_pct"):
@@ -33,13 +33,10 @@ def draw_ui(win, gm):
     pygame.draw.rect(win, WHITE,     (10, HEIGHT - bar_height, 20, bar_height))
 
 
-    # kick off background evaluation if idle
-    if not gm.bar_ai.evaluating:
-        gm.bar_ai.evaluate_position_async(board)
-
     # ── board drawing …  (unchanged) ────────────────────────────────
 
 
+    grid = board.grid
     for r in range(ROWS):
         for c in range(COLS):
             rect = pygame.Rect(c * SQUARE_SIZE + 40, r * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
@@ -50,7 +47,7 @@ def draw_ui(win, gm):
                 pygame.draw.rect(win, GREEN, rect)
             pygame.draw.rect(win, LINE_COLOR, rect, 1)
             center = rect.center
-            val = board.grid[r][c]
+            val = grid[r][c]
             if val == BLACK:
                 pygame.gfxdraw.filled_circle(win, center[0], center[1], SQUARE_SIZE//2 - 6, BLACK)
                 pygame.gfxdraw.aacircle(win, center[0], center[1], SQUARE_SIZE//2 - 6, BLACK)